@@ -0,0 +1,308 @@
+"""
+Author: Ryan Roler (ryan.roler@gmail.com)
+Benchmarks for parsing, arithmetic, division, evaluation and output.
+Polys are generated from a fixed seed, dense and sparse, with integer
+and float coefficients, at increasing degrees, so that every run times
+the same work. Before anything is timed, every result is checked against
+plain reference implementations (term by term sums and products, long
+division, evaluation power by power), so that a change which breaks an
+operation fails the run rather than just timing it. Results go to a JSON
+file that later runs can be compared against, and a table per kind of
+poly shows how each operation scales, ending in the exponent k of the
+best fitting n^k.
+
+    python bench.py                       all degrees, to bench.json
+    python bench.py --quick               small degrees only
+    python bench.py --compare old.json    ratios against an earlier run
+    python bench.py --no-check            time without checking results
+"""
+
+import argparse
+import json
+from math import log
+import os
+import platform
+import random
+import subprocess
+import time
+
+from polynator import Poly, Term, parse_poly
+
+#: Degrees timed by a full run and by a quick one.
+DEGREES = (16, 64, 256, 1024, 4096)
+QUICK_DEGREES = (16, 64, 256)
+SEED = 222
+#: Each timing repeats an operation until it has run this many seconds,
+#: and the best of REPEAT such timings is kept.
+MIN_TIME = 0.05
+REPEAT = 3
+#: Float results may differ from the reference by this much relative to
+#: the largest reference coefficient.
+TOLERANCE = 1e-9
+#: Relative error of a float coefficient read back from str's text.
+TEXT_TOLERANCE = 5e-3
+KINDS = ('dense int', 'dense float', 'sparse int', 'sparse float')
+
+
+def make_poly(rand, kind, degree, monic=False):
+    """Random poly of a kind at a degree. Sparse ones have a term per 16
+    exponents.
+    """
+    shape, domain = kind.split()
+    if shape == 'dense':
+        expos = range(degree + 1)
+    else:
+        expos = sorted(set(rand.sample(range(degree), max(degree // 16, 1)))
+                       | {degree})
+    if domain == 'int':
+        coeffs = [rand.choice((-1, 1)) * rand.randint(1, 99) for _ in expos]
+    else:
+        coeffs = [rand.uniform(-1, 1) or 1.0 for _ in expos]
+    if monic:
+        coeffs[-1] = 1
+    return Poly(*(Term(coeff, 'x', expo)
+                  for expo, coeff in zip(expos, coeffs)), domain=domain)
+
+
+def _items(poly):
+    """{exponent: coefficient} of the non-zero terms of a poly"""
+    return {term.expo: term.coeff for term in poly if term.coeff}
+
+
+def ref_add(a, b):
+    res = dict(a)
+    for expo, coeff in b.items():
+        res[expo] = res.get(expo, 0) + coeff
+    return res
+
+
+def ref_mul(a, b):
+    """Schoolbook product over the non-zero terms"""
+    res = [0] * (max(a, default=0) + max(b, default=0) + 1)
+    pairs = list(b.items())
+    for i, x in a.items():
+        for j, y in pairs:
+            res[i + j] += x * y
+    return dict(enumerate(res))
+
+
+def ref_divmod(a, b):
+    """Long division by a monic divisor"""
+    top = max(b)
+    rem = [0] * (max(a, default=0) + 1)
+    for expo, coeff in a.items():
+        rem[expo] = coeff
+    quot = {}
+    pairs = list(b.items())
+    for shift in range(len(rem) - 1 - top, -1, -1):
+        factor = rem[shift + top]
+        if factor:
+            quot[shift] = factor
+            for expo, coeff in pairs:
+                rem[shift + expo] -= factor * coeff
+    return quot, {expo: coeff for expo, coeff in enumerate(rem[:top])}
+
+
+def ref_plug(a, value):
+    return sum(coeff * value ** expo for expo, coeff in a.items())
+
+
+def _nonzero(items):
+    return {expo: coeff for expo, coeff in items.items() if coeff}
+
+
+def _check(kind, degree, op, got, want):
+    """Raise ValueError unless got matches want: exactly for int polys,
+    within TOLERANCE of the largest coefficient for float ones.
+    """
+    if not isinstance(want, dict):
+        got, want = {0: got}, {0: want}
+    got, want = _nonzero(got), _nonzero(want)
+    scale = max(map(abs, want.values()), default=0)
+    error = max((abs(got.get(expo, 0) - want.get(expo, 0))
+                 for expo in set(got) | set(want)), default=0)
+    if kind.endswith('int') and op != 'plug':
+        bad = error != 0
+    else:
+        bad = not error <= TOLERANCE * max(scale, 1)
+    if bad:
+        raise ValueError("{} {} at degree {} is off the reference by {:.3e}"
+                         .format(kind, op, degree, error))
+
+
+def cases(kind, degree, seed=SEED, check=True):
+    """(operation, function) pairs timed for a kind at a degree. Unless
+    check is off, every function's result is first checked against the
+    reference implementations, raising ValueError if one differs.
+    """
+    rand = random.Random('{} {} {}'.format(seed, kind, degree))
+    a = make_poly(rand, kind, degree)
+    b = make_poly(rand, kind, degree)
+    divisor = make_poly(rand, kind, degree // 2, monic=True)
+    text = str(a)
+    domain = a.domain
+    res = [('parse', lambda: parse_poly(text, domain)),
+           ('+', lambda: a + b),
+           ('*', lambda: a * b),
+           ('divmod', lambda: divmod(a, divisor)),
+           ('plug', lambda: a.plug(0.999)),
+           ('str', lambda: str(a))]
+    if check:
+        items, others = _items(a), _items(b)
+        quot, rem = divmod(a, divisor)
+        want_quot, want_rem = ref_divmod(items, _items(divisor))
+        found = {'+': (_items(a + b), ref_add(items, others)),
+                 '*': (_items(a * b), ref_mul(items, others)),
+                 'quotient': (_items(quot), want_quot),
+                 'remainder': (_items(rem), want_rem),
+                 'plug': (a.plug(0.999), ref_plug(items, 0.999))}
+        for op, (got, want) in found.items():
+            _check(kind, degree, op, got, want)
+        # str writes floats to three significant figures, so parsing its
+        # text gives back every coefficient to within half the last digit
+        parsed = _items(parse_poly(text, domain))
+        close = TEXT_TOLERANCE if kind.endswith('float') else 0
+        if set(parsed) != set(items) or any(
+                abs(parsed[expo] - coeff) > close * abs(coeff)
+                for expo, coeff in items.items()):
+            raise ValueError("{} str and parse at degree {} do not give the "
+                             "poly back".format(kind, degree))
+    return res
+
+
+def best_time(func, min_time=MIN_TIME, repeat=REPEAT):
+    """Best seconds per call of func over repeat timings"""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        spent = time.perf_counter() - start
+        if spent >= min_time:
+            break
+        number *= 2
+    best = spent / number
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def _commit():
+    """Short hash of the commit being timed, if there is one"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                              capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))
+                              ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(degrees=DEGREES, seed=SEED, min_time=MIN_TIME, repeat=REPEAT,
+        out=print, check=True):
+    """Time every operation for every kind and degree, checking results
+    first unless check is off. Returns the results as a dict ready for
+    JSON; progress goes to out.
+    """
+    Poly.cache_operations(0)  # Time the work, not cache hits
+    results = []
+    for kind in KINDS:
+        for degree in degrees:
+            for op, func in cases(kind, degree, seed, check):
+                seconds = best_time(func, min_time, repeat)
+                results.append({'kind': kind, 'degree': degree, 'op': op,
+                                'seconds': seconds})
+                out("{:<13}{:>6}  {:<7}{:>12.3e} s".format(kind, degree, op,
+                                                          seconds))
+    return {'commit': _commit(), 'python': platform.python_version(),
+            'machine': platform.machine(), 'seed': seed,
+            'results': results}
+
+
+def _grid(results):
+    """{kind: {op: {degree: seconds}}}"""
+    grid = {}
+    for row in results:
+        grid.setdefault(row['kind'], {}).setdefault(row['op'], {})[
+            row['degree']] = row['seconds']
+    return grid
+
+
+def slope(times):
+    """Exponent k of the least squares fit of seconds ~ degree^k"""
+    points = [(log(degree), log(seconds))
+              for degree, seconds in times.items() if seconds > 0]
+    if len(points) < 2:
+        return float('nan')
+    mean_x = sum(x for x, y in points) / len(points)
+    mean_y = sum(y for x, y in points) / len(points)
+    spread = sum((x - mean_x) ** 2 for x, y in points)
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / spread
+
+
+def tables(report, baseline=None):
+    """Scaling tables as text: seconds per call for each operation and
+    degree, and the fitted exponent. Given a baseline report, each cell
+    is this run's time over the baseline's instead; the exponent is
+    always this run's.
+    """
+    grid = _grid(report['results'])
+    base = _grid(baseline['results']) if baseline else None
+    lines = []
+    for kind, ops in grid.items():
+        degrees = sorted({degree for times in ops.values()
+                          for degree in times})
+        lines.append('')
+        lines.append('{} ({})'.format(kind, 'ratio to baseline' if base
+                                      else 'seconds per call'))
+        lines.append('{:<8}'.format('degree') +
+                     ''.join('{:>11}'.format(degree) for degree in degrees) +
+                     '{:>8}'.format('n^k'))
+        for op, times in ops.items():
+            cells = []
+            for degree in degrees:
+                seconds = times.get(degree)
+                if base:
+                    old = base.get(kind, {}).get(op, {}).get(degree)
+                    seconds = seconds / old if seconds and old else None
+                    cells.append('{:>11.2f}'.format(seconds) if seconds
+                                 else '{:>11}'.format('-'))
+                else:
+                    cells.append('{:>11.2e}'.format(seconds) if seconds
+                                 else '{:>11}'.format('-'))
+            lines.append('{:<8}'.format(op) + ''.join(cells) +
+                         '{:>8.2f}'.format(slope(times)))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time Poly operations "
+                                     "across kinds and degrees")
+    parser.add_argument('--out', default='bench.json',
+                        help="JSON file for the results")
+    parser.add_argument('--quick', action='store_true',
+                        help="small degrees only")
+    parser.add_argument('--degrees', type=int, nargs='+',
+                        help="degrees to time")
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--compare', metavar='JSON',
+                        help="earlier results to show ratios against")
+    parser.add_argument('--no-check', dest='check', action='store_false',
+                        help="skip checking results against the reference")
+    args = parser.parse_args(argv)
+
+    degrees = args.degrees or (QUICK_DEGREES if args.quick else DEGREES)
+    report = run(degrees, args.seed, check=args.check)
+    with open(args.out, 'w') as file:
+        json.dump(report, file, indent=1)
+    print(tables(report))
+    if args.compare:
+        with open(args.compare) as file:
+            print(tables(report, json.load(file)))
+
+
+if __name__ == '__main__':
+    main()
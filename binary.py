@@ -0,0 +1,182 @@
+"""
+Author: Ryan Roler (ryan.roler@gmail.com)
+Compact binary format for the array backends. A record is a fixed-size
+header followed by packed little-endian buffers, each a multiple of eight
+bytes long so that every buffer in a run of records stays aligned:
+
+    header        magic, version, backend, domain, variable as a Unicode
+                  code point, int width, number of terms
+    modulus       GF(p) only, one int
+    exponents     sparse only, one int64 per term
+    coefficients  float64 for floats, ints of the header's width for the
+                  exact domains, numerators then denominators for
+                  rationals
+
+Float buffers go into the coefficient arrays with a single block copy;
+no coefficient passes through Python on the way.
+"""
+
+from array import array
+from fractions import Fraction
+import struct
+import sys
+
+import domains
+from dense import Dense
+from sparse import Sparse
+
+#: Magic, version, backend, domain, variable as a code point (0 for
+#: none), int width in bytes and number of terms.
+HEADER = struct.Struct('<4sBBBxIIQ')
+MAGIC = b'POLY'
+VERSION = 2
+
+_DENSE, _SPARSE = 0, 1
+_FLOAT, _INTEGER, _RATIONAL, _MODULAR = range(4)
+_SWAP = sys.byteorder != 'little'
+
+
+def _code(domain):
+    if domain.modulus:
+        return _MODULAR
+    return {domains.FLOAT: _FLOAT, domains.INTEGER: _INTEGER,
+            domains.RATIONAL: _RATIONAL}[domain]
+
+
+def _width(nums):
+    """Bytes per int, a multiple of eight, that holds every int signed"""
+    bits = max((num.bit_length() for num in nums), default=0) + 1
+    return -(-bits // 64) * 8
+
+
+def _ints(nums, width):
+    if width == 8:
+        return _words('q', nums)
+    return b''.join(num.to_bytes(width, 'little', signed=True)
+                    for num in nums)
+
+
+def _words(code, nums):
+    packed = array(code, nums)
+    if _SWAP:
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def _from_words(code, buffer):
+    packed = array(code)
+    packed.frombytes(buffer)
+    if _SWAP:
+        packed.byteswap()
+    return packed
+
+
+def _from_ints(buffer, width):
+    if width == 8:
+        return _from_words('q', buffer).tolist()
+    return [int.from_bytes(buffer[i:i + width], 'little', signed=True)
+            for i in range(0, len(buffer), width)]
+
+
+def pack(rep):
+    """The record for a Dense or Sparse array, as bytes"""
+    domain = rep.domain
+    code = _code(domain)
+    coeffs = rep.coeffs
+    head = []
+    if code == _FLOAT:
+        width = 8
+        body = [_words('d', coeffs)]
+    elif code == _RATIONAL:
+        nums = [coeff.numerator for coeff in coeffs]
+        dens = [coeff.denominator for coeff in coeffs]
+        width = _width(nums + dens)
+        body = [_ints(nums, width), _ints(dens, width)]
+    else:
+        width = _width(list(coeffs) + [domain.modulus or 0])
+        if domain.modulus:
+            head.append(_ints([domain.modulus], width))
+        body = [_ints(coeffs, width)]
+    if isinstance(rep, Sparse):
+        kind = _SPARSE
+        head.append(_words('q', rep.expos))
+    else:
+        kind = _DENSE
+    var = ord(rep.var) if rep.var else 0
+    return b''.join([HEADER.pack(MAGIC, VERSION, kind, code, var, width,
+                                 len(coeffs))] + head + body)
+
+
+def size(buffer, offset=0):
+    """Length in bytes of the record starting at offset"""
+    magic, version, kind, code, var, width, count = HEADER.unpack_from(
+        buffer, offset)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a polynomial record (at byte {})"
+                         .format(offset))
+    length = HEADER.size + count * width * (2 if code == _RATIONAL else 1)
+    if code == _MODULAR:
+        length += width
+    if kind == _SPARSE:
+        length += count * 8
+    return length
+
+
+def unpack(buffer, offset=0):
+    """(Dense or Sparse array, offset just past it) for the record at
+    offset of any bytes-like buffer, such as a memoryview over a mmap.
+    """
+    end = offset + size(buffer, offset)
+    magic, version, kind, code, var, width, count = HEADER.unpack_from(
+        buffer, offset)
+    view = memoryview(buffer)[offset + HEADER.size:end]
+    var = chr(var) if var else ''
+    if code == _MODULAR:
+        domain = domains.GF(_from_ints(view[:width], width)[0])
+        view = view[width:]
+    else:
+        domain = (domains.FLOAT, domains.INTEGER, domains.RATIONAL)[code]
+
+    if kind == _SPARSE:
+        expos = _from_words('q', view[:count * 8])
+        view = view[count * 8:]
+    if code == _FLOAT:
+        coeffs = _from_words('d', view)
+    elif code == _RATIONAL:
+        split = count * width
+        coeffs = [Fraction(num, den) for num, den in
+                  zip(_from_ints(view[:split], width),
+                      _from_ints(view[split:], width))]
+    else:
+        coeffs = _from_ints(view, width)
+
+    if kind == _SPARSE:
+        return Sparse(expos, coeffs, var, domain), end
+    return Dense(coeffs, var, domain), end
+
+
+def int64s(buffer):
+    """Little-endian int64s of a buffer: a memoryview straight over it
+    where the machine's byte order allows, otherwise a copy in an array.
+    """
+    if _SWAP:
+        return _from_words('q', buffer)
+    return memoryview(buffer).cast('q')
+
+
+def pack_int64s(nums):
+    """Ints as a buffer of little-endian int64s"""
+    return _words('q', nums)
+
+
+def float_view(buffer, offset=0):
+    """Float coefficients of the record at offset as a memoryview of
+    doubles straight over the buffer, lowest exponent first, without
+    copying. Only float records on little-endian machines have one.
+    """
+    end = offset + size(buffer, offset)
+    magic, version, kind, code, var, width, count = HEADER.unpack_from(
+        buffer, offset)
+    if code != _FLOAT or _SWAP:
+        raise ValueError("Only float records can be viewed in place")
+    return memoryview(buffer)[end - count * 8:end].cast('d')
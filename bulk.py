@@ -0,0 +1,192 @@
+"""
+Author: Ryan Roler (ryan.roler@gmail.com)
+Bulk storage of polynomials. Text files holding one polynomial per line
+are read in large blocks and parsed lazily, optionally by a pool of
+worker processes, with only a bounded number of blocks in memory at any
+time. Workers hand back coefficient arrays rather than Poly objects,
+which pickle compactly and are wrapped without copying.
+
+Stores are binary files of the records in binary.py, back to back, then
+an index of where each record starts and a trailer. They are memory
+mapped, so opening one costs the same whatever its size, and each poly
+is unpacked only when it is asked for.
+"""
+
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import mmap
+import struct
+
+import binary
+import domains
+from dense import Dense
+from sparse import Sparse
+from polynator import Poly, parse_poly, _parse_rep
+
+#: Characters read per block. Only whole lines are read, so a block may
+#: run over by part of a line.
+CHUNK_SIZE = 1 << 20
+#: Blocks queued per worker process, so that reading never runs far
+#: ahead of whoever consumes the polys.
+AHEAD = 2
+#: Last bytes of a store: magic, number of polys and where the index of
+#: their offsets starts.
+TRAILER = struct.Struct('<4sQQ')
+STORE_MAGIC = b'PSTO'
+
+
+def _blocks(file, chunk_size):
+    """(number of the first line, lines) for each block of the file"""
+    lineno = 1
+    while True:
+        lines = file.readlines(chunk_size)
+        if not lines:
+            return
+        yield lineno, lines
+        lineno += len(lines)
+
+
+def _parse_block(lineno, lines, domain):
+    """Flat form of every non-blank line: (var, exponents, coefficients)
+    for array backends, with None for the exponents of dense ones, or the
+    line itself if it has to be held as Terms. SyntaxErrors name the line.
+    """
+    domain = domains.get_domain(domain)
+    res = []
+    for num, line in enumerate(lines, lineno):
+        if not line.strip():
+            continue
+        try:
+            rep = _parse_rep(line, domain)
+        except SyntaxError as err:
+            raise SyntaxError("{} on line {}".format(err, num))
+        if rep is None:
+            res.append(line)
+        elif isinstance(rep, Dense):
+            res.append((rep.var, None, rep.coeffs))
+        else:
+            res.append((rep.var, rep.expos, rep.coeffs))
+    return res
+
+
+def _build(flat, domain, raw):
+    """Poly, or dense coefficients if raw, from the flat form of a line"""
+    if isinstance(flat, str):
+        if raw:
+            raise ValueError("'{}' has no coefficient array".format(
+                             flat.strip()))
+        return parse_poly(flat, domain)
+    var, expos, coeffs = flat
+    if expos is None:
+        rep = Dense(coeffs, var, domain)
+    else:
+        rep = Sparse(expos, coeffs, var, domain)
+        if raw:
+            return Dense.from_items(rep.items(), var, domain).coeffs
+    return rep.coeffs if raw else Poly._from_rep(rep)
+
+
+def iter_polys(file, chunk_size=CHUNK_SIZE, domain=None, raw=False,
+               processes=None):
+    """Parse a file, or the path of one, holding one polynomial per line,
+    yielding a Poly per non-blank line. With raw set, the dense
+    coefficients are yielded instead, lowest exponent first in the
+    domain's storage, and polys that need Terms raise ValueError.
+    Given a number of processes, blocks of chunk_size characters are
+    parsed by that many workers, AHEAD blocks apiece at most.
+    """
+    if isinstance(file, str):
+        with open(file) as handle:
+            yield from iter_polys(handle, chunk_size, domain, raw, processes)
+        return
+
+    domain = domains.get_domain(domain)
+    blocks = _blocks(file, chunk_size)
+    if not processes:
+        for lineno, lines in blocks:
+            for flat in _parse_block(lineno, lines, domain.name):
+                yield _build(flat, domain, raw)
+        return
+
+    pool = ProcessPoolExecutor(processes)
+    try:
+        pending = deque()
+        for block in blocks:
+            pending.append(pool.submit(_parse_block, *block, domain.name))
+            if len(pending) < AHEAD * processes:
+                continue
+            for flat in pending.popleft().result():
+                yield _build(flat, domain, raw)
+        while pending:
+            for flat in pending.popleft().result():
+                yield _build(flat, domain, raw)
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+
+def write_store(file, polys):
+    """Write polys to a binary file, or the path of one, as a store that
+    PolyStore can map. Returns the number written.
+    """
+    if isinstance(file, str):
+        with open(file, 'wb') as handle:
+            return write_store(handle, polys)
+    offsets = array('q')
+    pos = 0
+    for poly in polys:
+        record = poly.to_bytes()
+        offsets.append(pos)
+        file.write(record)
+        pos += len(record)
+    file.write(binary.pack_int64s(offsets))
+    file.write(TRAILER.pack(STORE_MAGIC, len(offsets), pos))
+    return len(offsets)
+
+
+class PolyStore():
+    """Read-only view of a store written by write_store. Opening maps the
+    file and reads its trailer; the index of offsets is used where it
+    lies in the mapping. Indexing unpacks one poly, iterating unpacks
+    them in turn, and coeffs gives float coefficients without copying.
+    """
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, index = TRAILER.unpack_from(
+            self._map, len(self._map) - TRAILER.size)
+        if magic != STORE_MAGIC:
+            self.close()
+            raise ValueError("{} is not a poly store".format(path))
+        self._offsets = binary.int64s(
+            memoryview(self._map)[index:index + 8 * count])
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __getitem__(self, index):
+        return Poly.from_bytes(self._map, self._offsets[index])
+
+    def __iter__(self):
+        for offset in self._offsets:
+            yield Poly.from_bytes(self._map, offset)
+
+    def coeffs(self, index):
+        """Float coefficients of a poly, lowest exponent first, as a
+        memoryview of doubles over the mapping; see binary.float_view.
+        """
+        return binary.float_view(self._map, self._offsets[index])
+
+    def close(self):
+        """Unmap the store. Views from coeffs must be released first."""
+        if isinstance(getattr(self, '_offsets', None), memoryview):
+            self._offsets.release()
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
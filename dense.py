@@ -0,0 +1,223 @@
+"""
+Author: Ryan Roler (ryan.roler@gmail.com)
+Dense coefficient-array backend for single variable polynomials.
+"""
+
+from itertools import islice, repeat
+import operator
+
+import division
+import evaluate
+import multiply
+from domains import FLOAT
+
+
+def trim(coeffs):
+    """Drop trailing zero coefficients in place so that the last slot
+    always holds the leading coefficient.
+    """
+    while coeffs and not coeffs[-1]:
+        coeffs.pop()
+    return coeffs
+
+
+def add(a, b):
+    """Coefficient-wise sum of two dense arrays of the same storage"""
+    if len(a) < len(b):
+        a, b = b, a
+    res = a[:]
+    for i, coeff in enumerate(b):
+        res[i] += coeff
+    return trim(res)
+
+
+def sub(a, b):
+    """Coefficient-wise difference of two dense arrays of the same storage"""
+    res = a[:]
+    res.extend(-coeff for coeff in b[len(a):])
+    for i in range(min(len(a), len(b))):
+        res[i] -= b[i]
+    return trim(res)
+
+
+def mul(a, b, domain=FLOAT):
+    """Product of two dense arrays, see multiply.mul"""
+    return trim(domain.storage(multiply.mul(a, b, domain.modulus)))
+
+
+def divmod_(a, b, domain=FLOAT):
+    """Quotient and remainder of two dense arrays, see division.divmod_"""
+    quot, rem = division.divmod_(a, b, domain)
+    return trim(domain.storage(quot)), trim(domain.storage(rem))
+
+
+class Dense():
+    """Dense polynomials hold a single variable and one coefficient per
+    exponent, lowest exponent first: 3x^2 + 1 is kept as
+    array('d', [1.0, 0.0, 3.0]). Constant polynomials have no variable.
+    Exact domains keep their coefficients in a list instead of an array,
+    see domains.py.
+    """
+
+    __slots__ = ('var', 'coeffs', 'domain')
+
+    def __init__(self, coeffs=(), var='', domain=FLOAT):
+        """Coefficients must already belong to the domain. Containers of
+        the domain's storage type are adopted as-is rather than copied.
+        """
+        if type(coeffs) is not type(domain.storage()):
+            coeffs = domain.storage(coeffs)
+        self.coeffs = trim(coeffs)
+        self.domain = domain
+        self.var = var if len(self.coeffs) > 1 else ''
+
+    def __repr__(self):
+        return "Dense({!r}, {!r}, {!r})".format(list(self.coeffs), self.var,
+                                               self.domain)
+
+    def __eq__(self, other):
+        if isinstance(other, Dense):
+            return self.var == other.var and self.coeffs == other.coeffs
+        return NotImplemented
+
+    def __len__(self):
+        return len(self.coeffs)
+
+    def __copy__(self):
+        return Dense(self.coeffs[:], self.var, self.domain)
+
+    @classmethod
+    def from_items(cls, items, var='', domain=FLOAT):
+        """Build from (exponent, coefficient) pairs, converting the
+        coefficients into the domain. Repeated exponents are summed.
+        """
+        items = list(items)
+        size = max((expo for expo, coeff in items), default=-1) + 1
+        coeffs = domain.storage([domain.zero]) * size
+        for expo, coeff in items:
+            coeffs[expo] += domain.convert(coeff)
+        return cls(domain.reduce(coeffs), var, domain)
+
+    def to_domain(self, domain):
+        """The same polynomial with its coefficients converted"""
+        if domain is self.domain:
+            return self
+        return Dense(domain.storage(map(domain.convert, self.coeffs)),
+                     self.var, domain)
+
+    @property
+    def degree(self):
+        return max(len(self.coeffs) - 1, 0)
+
+    def nonzero(self):
+        """Number of non-zero coefficients"""
+        return len(self.coeffs) - self.coeffs.count(0)
+
+    def leading(self):
+        """(exponent, coefficient) of the leading term"""
+        return len(self.coeffs) - 1, self.coeffs[-1]
+
+    def coeff(self, expo):
+        """Coefficient of the given exponent"""
+        if 0 <= expo < len(self.coeffs):
+            return self.coeffs[expo]
+        return self.domain.zero
+
+    def item(self, index):
+        """index-th (exponent, coefficient) pair, highest exponent first"""
+        if index < 0:
+            pairs = ((expo, coeff) for expo, coeff in enumerate(self.coeffs)
+                     if coeff)
+            index = -1 - index
+        else:
+            pairs = self.items()
+        for pair in islice(pairs, index, None):
+            return pair
+        raise IndexError("Term index out of range")
+
+    def items(self):
+        """(exponent, coefficient) pairs of the non-zero coefficients,
+        highest exponent first.
+        """
+        coeffs = self.coeffs
+        return ((expo, coeff) for expo, coeff in
+                zip(range(len(coeffs) - 1, -1, -1), reversed(coeffs))
+                if coeff)
+
+    def compatible(self, other):
+        """Whether both polynomials can share a dense array"""
+        return not (self.var and other.var and self.var != other.var)
+
+    def __join(self, other, coeffs):
+        return Dense(self.domain.reduce(coeffs), self.var or other.var,
+                     self.domain)
+
+    def __add__(self, other):
+        return self.__join(other, add(self.coeffs, other.coeffs))
+
+    def __sub__(self, other):
+        return self.__join(other, sub(self.coeffs, other.coeffs))
+
+    def __mul__(self, other):
+        return self.__join(other, mul(self.coeffs, other.coeffs,
+                                      self.domain))
+
+    def __absorb(self, other, sign):
+        """Add sign * other into this array in place, touching only the
+        slots other covers.
+        """
+        coeffs, theirs = self.coeffs, other.coeffs
+        if len(coeffs) < len(theirs):
+            coeffs.extend(repeat(self.domain.zero, len(theirs) - len(coeffs)))
+        size = len(theirs)
+        op = operator.add if sign > 0 else operator.sub
+        coeffs[:size] = self.domain.reduce(self.domain.storage(
+            map(op, coeffs[:size], theirs)))
+        trim(coeffs)
+        self.var = (self.var or other.var) if len(coeffs) > 1 else ''
+        return self
+
+    def __iadd__(self, other):
+        return self.__absorb(other, 1)
+
+    def __isub__(self, other):
+        return self.__absorb(other, -1)
+
+    def __divmod__(self, other):
+        quot, rem = divmod_(self.coeffs, other.coeffs, self.domain)
+        return self.__join(other, quot), self.__join(other, rem)
+
+    def diff(self):
+        """Derivative"""
+        coeffs = self.coeffs
+        slopes = map(operator.mul, coeffs[1:], range(1, len(coeffs)))
+        return Dense(self.domain.reduce(self.domain.storage(slopes)),
+                     self.var, self.domain)
+
+    def integrate(self, constant):
+        """Antiderivative with the given constant term, both in a field"""
+        quo = self.domain.quo
+        coeffs = self.domain.storage([constant])
+        coeffs.extend(map(quo, self.coeffs, range(1, len(self.coeffs) + 1)))
+        return Dense(self.domain.reduce(coeffs), self.var, self.domain)
+
+    def compose(self, other):
+        """This polynomial evaluated at another"""
+        return Dense(self.domain.storage(evaluate.compose(
+                         self.coeffs, other.coeffs, self.domain.modulus)),
+                     other.var, self.domain)
+
+    def scale(self, factor):
+        """Multiply every coefficient by factor, already in the domain"""
+        return Dense(self.domain.reduce(self.domain.storage(
+                         coeff * factor for coeff in self.coeffs)),
+                     self.var, self.domain)
+
+    def plug(self, value):
+        return evaluate.horner(self.coeffs, value, self.domain.modulus)
+
+    def plug_many(self, points):
+        return evaluate.horner_many(self.coeffs, points, self.domain.modulus)
+
+    def compile(self):
+        return evaluate.compile_horner(self.coeffs, self.domain.modulus)
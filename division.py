@@ -0,0 +1,114 @@
+"""
+Author: Ryan Roler (ryan.roler@gmail.com)
+Division engine for dense coefficient sequences. Large divisions invert
+the reversed divisor as a power series by Newton iteration, so that the
+quotient costs a couple of fast products; small ones use long division.
+"""
+
+import multiply
+from domains import FLOAT
+from multiply import mul
+
+#: Divisions whose quotient or divisor has at most this many coefficients
+#: use long division. Without numpy's FFT the products Newton iteration
+#: relies on are only Karatsuba, which pays off much later.
+NEWTON_CUTOFF = 48 if multiply.numpy is not None else 4096
+
+
+def long_divmod(a, b, domain=FLOAT):
+    """Long division, working on the remainder in place. Returns the
+    (quotient, remainder) pair of lists. Over a ring such as the integers
+    the division stops at the first remainder term that the divisor's
+    leading coefficient does not divide.
+    """
+    rem = list(a)
+    shift = len(a) - len(b)
+    if shift < 0:
+        return [], rem
+    quo = domain.quo
+    quot = [domain.zero] * (shift + 1)
+    lead = b[-1]
+    top = len(b) - 1
+    for i in range(shift, -1, -1):
+        factor = quo(rem[i + top], lead)
+        if factor is None:
+            return quot, rem[:i + top + 1]
+        quot[i] = factor
+        if factor:
+            for j in range(top):
+                rem[i + j] -= factor * b[j]
+    # The eliminated slots are dropped rather than left holding residue
+    return quot, rem[:top]
+
+
+#: Newton division gives up, in favour of long division, once the float
+#: reciprocal grows this far past 1 / f[0]. Growth of that size means the
+#: final product would be ruined by cancellation.
+GROWTH_LIMIT = 1e8
+#: Cutoff in place of NEWTON_CUTOFF for coefficients mod a prime, whose
+#: products are exact and fast with or without numpy.
+MODULAR_NEWTON_CUTOFF = 64
+
+
+def reciprocal(f, n, domain=FLOAT, limit=None):
+    """First n coefficients of the power series 1 / f, by Newton
+    iteration: g <- g * (2 - f * g), doubling the precision each step.
+    Returns None if any coefficient grows past the optional limit.
+    """
+    modulus = domain.modulus
+    g = [domain.quo(domain.one, f[0])]
+    prec = 1
+    while prec < n:
+        prec = min(2 * prec, n)
+        err = [-coeff for coeff in mul(f[:prec], g, modulus)[:prec]]
+        err[0] += 2
+        g = mul(g, domain.reduce(err), modulus)[:prec]
+        if limit is not None and max(map(abs, g)) > limit:
+            return None
+    return g
+
+
+def newton_divmod(a, b, domain=FLOAT):
+    """Division through the reciprocal of the reversed divisor. Reversing
+    turns division into a power series product: the reversed quotient is
+    rev(a) / rev(b) truncated to the quotient's length. Returns None when
+    the reciprocal grows too quickly for float arithmetic to be trusted.
+    """
+    modulus = domain.modulus
+    size = len(a) - len(b) + 1
+    top = len(b) - 1
+    limit = None if domain.exact else GROWTH_LIMIT / abs(b[-1])
+    inv = reciprocal(b[::-1], size, domain, limit)
+    if inv is None:
+        return None
+    quot = mul(a[:-size - 1:-1], inv, modulus)[:size][::-1]
+    prod = mul(b, quot, modulus)
+    rem = [a[i] - prod[i] for i in range(top)]
+    if domain.exact:
+        return quot, domain.reduce(rem)
+
+    # The slots division eliminates have to come out negligible
+    scale = max(map(abs, a)) or 1.0
+    if not all(abs(a[i] - prod[i]) <= 1e-9 * scale
+               for i in range(top, len(a))):
+        return None
+    return quot, rem
+
+
+def divmod_(a, b, domain=FLOAT):
+    """Quotient and remainder lists of two coefficient sequences of the
+    domain, lowest exponent first, with b's leading coefficient non-zero.
+    Exact domains other than the integers mod a prime always use long
+    division, since the size of their reciprocal series' coefficients can
+    grow without bound.
+    """
+    if not len(b):
+        raise ZeroDivisionError("Division by the zero polynomial")
+    size = min(len(a) - len(b) + 1, len(b))
+    if domain.modulus and size > MODULAR_NEWTON_CUTOFF:
+        return newton_divmod(list(a), list(b), domain)
+    elif not domain.exact and size > NEWTON_CUTOFF:
+        res = newton_divmod(list(a), list(b))
+        if res is not None:
+            return res
+    return long_divmod(a, b, domain)
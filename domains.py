@@ -0,0 +1,238 @@
+"""
+Author: Ryan Roler (ryan.roler@gmail.com)
+Coefficient domains. A domain decides what type coefficients are held in,
+how they are stored, and how they divide, so that arithmetic on exact
+coefficients never strays into floats.
+"""
+
+from array import array
+from fractions import Fraction
+import re
+
+
+class RealField():
+    """Float coefficients, stored in a contiguous array('d'). This is the
+    default domain, matching Term's float coefficients.
+    """
+
+    name = 'float'
+    exact = False
+    modulus = None
+    zero = 0.0
+    one = 1.0
+
+    def __repr__(self):
+        return 'FLOAT'
+
+    def convert(self, value):
+        return float(value)
+
+    def storage(self, values=()):
+        """Mutable container for coefficients of this domain"""
+        return array('d', values)
+
+    def quo(self, a, b):
+        """Exact quotient a / b, or None if b does not divide a"""
+        return a / b
+
+    def reduce(self, coeffs):
+        """Bring the results of plain arithmetic on coefficients back into
+        the domain. Returns a container of the domain's storage.
+        """
+        return coeffs
+
+
+class IntegerRing():
+    """Integer coefficients, kept as Python ints so that they never lose
+    precision however large they grow. Division only goes as far as the
+    divisor's leading coefficient divides exactly.
+    """
+
+    name = 'int'
+    exact = True
+    modulus = None
+    zero = 0
+    one = 1
+
+    def __repr__(self):
+        return 'INTEGER'
+
+    def convert(self, value):
+        if isinstance(value, int):
+            return value
+        if isinstance(value, Fraction) and value.denominator == 1:
+            return value.numerator
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+        raise ValueError("{} is not an integer".format(value))
+
+    def storage(self, values=()):
+        return list(values)
+
+    def quo(self, a, b):
+        quot, rem = divmod(a, b)
+        return None if rem else quot
+
+    def reduce(self, coeffs):
+        return coeffs
+
+
+class RationalField():
+    """Exact rational coefficients, kept as fractions.Fraction"""
+
+    name = 'rational'
+    exact = True
+    modulus = None
+    zero = Fraction(0)
+    one = Fraction(1)
+
+    def __repr__(self):
+        return 'RATIONAL'
+
+    def convert(self, value):
+        if isinstance(value, float):
+            # A float's shortest repr is what was typed in: 0.1 -> 1/10
+            return Fraction(repr(value))
+        return Fraction(value)
+
+    def storage(self, values=()):
+        return list(values)
+
+    def quo(self, a, b):
+        return Fraction(a) / b
+
+    def reduce(self, coeffs):
+        return coeffs
+
+
+def _is_prime(num):
+    """Miller-Rabin with the first twelve prime bases, which is exact
+    below 3.3 * 10^24 and overwhelmingly likely to be right beyond.
+    """
+    bases = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37)
+    if num < 2:
+        return False
+    for base in bases:
+        if num % base == 0:
+            return num == base
+    odd, twos = num - 1, 0
+    while not odd % 2:
+        odd //= 2
+        twos += 1
+    for base in bases:
+        test = pow(base, odd, num)
+        if test in (1, num - 1):
+            continue
+        for _ in range(twos - 1):
+            test = test * test % num
+            if test == num - 1:
+                break
+        else:
+            return False
+    return True
+
+
+class ModularField():
+    """Integers mod a prime p, kept as ints in range(p). Division
+    multiplies by modular inverses, so it is exact and never stops early.
+    Get instances through GF(p), which hands out one object per prime.
+    """
+
+    exact = True
+    zero = 0
+    one = 1
+
+    def __init__(self, modulus):
+        if not _is_prime(modulus):
+            raise ValueError("{} is not prime".format(modulus))
+        self.modulus = modulus
+        self.name = 'gf({})'.format(modulus)
+
+    def __repr__(self):
+        return 'GF({})'.format(self.modulus)
+
+    def convert(self, value):
+        if isinstance(value, int):
+            return value % self.modulus
+        if isinstance(value, Fraction):
+            return (value.numerator * self.inverse(value.denominator) %
+                    self.modulus)
+        if isinstance(value, float) and value.is_integer():
+            return int(value) % self.modulus
+        raise ValueError("{} has no value in {}".format(value, self))
+
+    def storage(self, values=()):
+        return list(values)
+
+    def inverse(self, value):
+        if not value % self.modulus:
+            raise ZeroDivisionError("{} has no inverse in {}".format(
+                                    value, self))
+        return pow(value, -1, self.modulus)
+
+    def quo(self, a, b):
+        return a * self.inverse(b) % self.modulus
+
+    def reduce(self, coeffs):
+        modulus = self.modulus
+        return [coeff % modulus for coeff in coeffs]
+
+
+_FIELDS = {}
+
+
+def GF(modulus):
+    """The field of integers mod the given prime"""
+    if modulus not in _FIELDS:
+        _FIELDS[modulus] = ModularField(modulus)
+    return _FIELDS[modulus]
+
+
+FLOAT = RealField()
+INTEGER = IntegerRing()
+RATIONAL = RationalField()
+
+_NAMED = {'float': FLOAT, float: FLOAT,
+          'int': INTEGER, 'integer': INTEGER, int: INTEGER,
+          'rational': RATIONAL, 'fraction': RATIONAL, Fraction: RATIONAL}
+
+
+def get_domain(spec):
+    """Domain for a domain object, a name ('float', 'int', 'rational',
+    'gf(7)'), a coefficient type (float, int, Fraction), or None for the
+    default.
+    """
+    if spec is None:
+        return FLOAT
+    if isinstance(spec, (RealField, IntegerRing, RationalField,
+                         ModularField)):
+        return spec
+    found = re.match(r'gf\((\d+)\)$', spec) if isinstance(spec, str) else None
+    if found:
+        return GF(int(found.group(1)))
+    try:
+        return _NAMED[spec.lower() if isinstance(spec, str) else spec]
+    except (KeyError, TypeError):
+        raise ValueError("Unknown coefficient domain ({})".format(spec))
+
+
+def of(value):
+    """Smallest domain holding a plain number exactly"""
+    if isinstance(value, int):
+        return INTEGER
+    elif isinstance(value, Fraction):
+        return RATIONAL
+    return FLOAT
+
+
+def unify(a, b):
+    """Domain that both a and b convert into"""
+    if a is b:
+        return a
+    elif a.modulus or b.modulus:
+        if INTEGER in (a, b):
+            return a if a.modulus else b
+        raise ValueError("Cannot mix {} and {} coefficients".format(a, b))
+    elif FLOAT in (a, b):
+        return FLOAT
+    return RATIONAL
@@ -0,0 +1,305 @@
+"""
+Author: Ryan Roler (ryan.roler@gmail.com)
+Polynomial evaluation: Horner's scheme for single points, and batch
+evaluation of many points at once, vectorized through numpy when present.
+Given a modulus, every step is reduced by it.
+"""
+
+from fractions import Fraction
+
+from multiply import mul
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+#: Batch evaluations of polynomials with at least this many coefficients
+#: use Estrin's scheme, which takes log2(n) array operations instead of n.
+ESTRIN_CUTOFF = 32
+#: Upper bound on the coefficient-by-point matrix Estrin's scheme builds,
+#: in elements. Larger batches are evaluated a block of points at a time.
+ESTRIN_BLOCK = 1 << 20
+
+
+def _exact(value):
+    """A numpy value as Python numbers: scalars as a Python int or float,
+    arrays as object arrays of them. Exact arithmetic on numpy's int64
+    would silently overflow, and three-argument pow refuses numpy values.
+    """
+    if numpy is not None:
+        if isinstance(value, numpy.ndarray):
+            return value.astype(object)
+        elif isinstance(value, numpy.generic):
+            return value.item()
+    return value
+
+
+def _inexact(value):
+    """numpy ints as floats, so that powers of them cannot overflow int64
+    before they meet a float coefficient.
+    """
+    if (numpy is not None and isinstance(value, (numpy.ndarray,
+                                                 numpy.generic)) and
+            value.dtype.kind in 'iub'):
+        return value.astype(float)
+    return value
+
+
+def _exactly(func, points):
+    """func of the points as a list of Python numbers. A numpy array of
+    points gives an object array of the same shape back.
+    """
+    if numpy is None:
+        return func(points)
+    if isinstance(points, numpy.ndarray):
+        res = numpy.empty(points.shape, dtype=object)
+        res.flat[:] = func(points.ravel().tolist())
+        return res
+    return func(list(map(_exact, points)))
+
+
+def _pow(value, expo, modulus):
+    """pow(value, expo, modulus) element by element for object arrays"""
+    if numpy is not None and isinstance(value, numpy.ndarray):
+        return numpy.frompyfunc(pow, 3, 1)(value, expo, modulus)
+    return pow(value, expo, modulus)
+
+
+def horner(coeffs, value, modulus=None):
+    """Evaluate coefficients, lowest exponent first, at one value"""
+    if not len(coeffs):
+        return 0.0 if modulus is None else 0
+    if numpy is not None and isinstance(value, numpy.generic):
+        value = value.item()
+    res = coeffs[-1]
+    if modulus:
+        for i in range(len(coeffs) - 2, -1, -1):
+            res = (res * value + coeffs[i]) % modulus
+        return res
+    for i in range(len(coeffs) - 2, -1, -1):
+        res = res * value + coeffs[i]
+    return res
+
+
+def _scale(res, value, gap, modulus):
+    """res * value^gap, overflowing to infinity as float products do
+    rather than raising OverflowError.
+    """
+    try:
+        return res * pow(value, gap, modulus)
+    except OverflowError:
+        if not res:
+            return res
+        negative = (res < 0) != (value < 0 and gap % 2 == 1)
+        return float('-inf') if negative else float('inf')
+
+
+def sparse_horner(expos, coeffs, value, modulus=None):
+    """Horner's scheme over ascending exponents, stepping over the gaps
+    between them with a single power each.
+    """
+    if numpy is not None and isinstance(value, numpy.generic):
+        value = value.item()
+    res = 0
+    prev = 0
+    for i in range(len(expos) - 1, -1, -1):
+        if prev:
+            res = _scale(res, value, prev - expos[i], modulus)
+        res += coeffs[i]
+        prev = expos[i]
+    if prev:
+        res = _scale(res, value, prev, modulus)
+    return res % modulus if modulus else res
+
+
+def _vectorize(coeffs, modulus):
+    """Whether numpy can evaluate the coefficients without losing
+    exactness: only float coefficients are handed to it.
+    """
+    return (numpy is not None and not modulus and
+            all(isinstance(coeff, float) for coeff in coeffs))
+
+
+def _as_array(points):
+    xs = numpy.asarray(points)
+    if xs.dtype.kind not in 'fc':
+        xs = xs.astype(float)
+    return xs
+
+
+def _estrin(coeffs, xs):
+    """Estrin's scheme over an array of points: neighbouring coefficients
+    are paired up as c0 + c1 * x, then the pairs as p0 + p1 * x^2, and so
+    on, halving the number of rows each pass.
+    """
+    level = numpy.outer(numpy.asarray(coeffs, dtype=xs.dtype),
+                        numpy.ones_like(xs))
+    power = xs
+    while len(level) > 1:
+        if len(level) % 2:
+            level = numpy.vstack([level, numpy.zeros_like(xs)])
+        level = level[0::2] + level[1::2] * power
+        power = power * power
+    return level[0]
+
+
+def horner_many(coeffs, points, modulus=None):
+    """Evaluate coefficients, lowest exponent first, at every point.
+    A numpy array of points gives a numpy array back, of floats for float
+    coefficients and of exact Python numbers for the exact domains;
+    anything else gives a list.
+    """
+    if not _vectorize(coeffs, modulus):
+        def each(points):
+            res = [0] * len(points)
+            for coeff in reversed(coeffs):
+                res = [acc * value + coeff for acc, value in zip(res, points)]
+                if modulus:
+                    res = [acc % modulus for acc in res]
+            return res
+        return _exactly(each, points)
+
+    xs = _as_array(points)
+    if len(coeffs) < ESTRIN_CUTOFF:
+        res = numpy.zeros_like(xs)
+        for coeff in reversed(coeffs):
+            res *= xs
+            res += coeff
+    else:
+        block = max(1, ESTRIN_BLOCK // len(coeffs))
+        flat = xs.ravel()
+        res = numpy.concatenate([_estrin(coeffs, flat[i:i + block])
+                                 for i in range(0, len(flat), block)] or
+                                [flat]).reshape(xs.shape)
+    return res if isinstance(points, numpy.ndarray) else res.tolist()
+
+
+def sparse_horner_many(expos, coeffs, points, modulus=None):
+    """Batch form of sparse_horner, giving back what horner_many does"""
+    if not _vectorize(coeffs, modulus):
+        return _exactly(lambda points: [
+            sparse_horner(expos, coeffs, value, modulus) for value in points],
+            points)
+
+    xs = _as_array(points)
+    res = numpy.zeros_like(xs)
+    prev = 0
+    for i in range(len(expos) - 1, -1, -1):
+        if prev:
+            res *= xs ** (prev - expos[i])
+        res += coeffs[i]
+        prev = expos[i]
+    if prev:
+        res *= xs ** prev
+    return res if isinstance(points, numpy.ndarray) else res.tolist()
+
+
+def _build(lines):
+    # repr gives 'inf' and 'nan' for non-finite coefficients and
+    # 'Fraction(1, 3)' for rational ones, so those names are defined for
+    # the generated code.
+    namespace = {'inf': float('inf'), 'nan': float('nan'),
+                 'Fraction': Fraction, '_exact': _exact, '_inexact': _inexact,
+                 '_pow': _pow}
+    exec(compile('\n'.join(lines), '<polynomial>', 'exec'), namespace)
+    return namespace['poly']
+
+
+def _step(power, coeff, modulus):
+    line = 'r * ' + power
+    if coeff:
+        line += ' {} {}'.format('-' if coeff < 0 else '+', repr(abs(coeff)))
+    if modulus:
+        line = '({}) % {}'.format(line, modulus)
+    return '    r = ' + line
+
+
+def _power(gap, modulus):
+    if gap == 1:
+        return 'x'
+    elif modulus:
+        return '_pow(x, {}, {})'.format(gap, modulus)
+    return 'x ** {}'.format(gap)
+
+
+def _header(coeffs, modulus):
+    """First lines of a generated function, which turn numpy points into
+    Python numbers for exact coefficients and into floats for float ones.
+    """
+    if modulus or not all(isinstance(coeff, float) for coeff in coeffs):
+        return ['def poly(x):', '    x = _exact(x)']
+    return ['def poly(x):', '    x = _inexact(x)']
+
+
+def compile_horner(coeffs, modulus=None):
+    """Generate a function evaluating the coefficients, lowest exponent
+    first, in Horner form with every coefficient baked in as a literal.
+    The function is straight-line arithmetic, so it takes numpy arrays of
+    points as readily as single values; for exact coefficients they come
+    back as object arrays of exact values, as from horner_many.
+    """
+    lines = _header(coeffs, modulus)
+    if not len(coeffs):
+        lines.append('    return 0')
+        return _build(lines)
+    lines.append('    r = ' + repr(coeffs[-1]))
+    for i in range(len(coeffs) - 2, -1, -1):
+        lines.append(_step('x', coeffs[i], modulus))
+    lines.append('    return r')
+    return _build(lines)
+
+
+def compile_sparse(expos, coeffs, modulus=None):
+    """Generate a function evaluating ascending sparse exponents and
+    their coefficients, in Horner form stepping over the gaps.
+    """
+    lines = _header(coeffs, modulus)
+    if not len(expos):
+        lines.append('    return 0')
+        return _build(lines)
+    lines.append('    r = ' + repr(coeffs[-1]))
+    for i in range(len(expos) - 2, -1, -1):
+        lines.append(_step(_power(expos[i + 1] - expos[i], modulus),
+                           coeffs[i], modulus))
+    if expos[0]:
+        lines.append(_step(_power(expos[0], modulus), 0, modulus))
+    lines.append('    return r')
+    return _build(lines)
+
+
+def compose(coeffs, inner, modulus=None):
+    """Coefficients of f(g(x)), both lowest exponent first, by divide and
+    conquer: splitting f as low + x^k * high gives
+    f(g) = low(g) + g^k * high(g), with k a power of two so that every
+    g^k is one of the repeated squares of g, worked out once. The big
+    products then go through multiply.mul's fast paths, where Horner's
+    scheme over polynomials would make n ever longer products.
+    """
+    if not len(coeffs):
+        return []
+    levels = (len(coeffs) - 1).bit_length()
+    squares = [list(inner)]
+    while len(squares) < levels:
+        squares.append(mul(squares[-1], squares[-1], modulus))
+
+    def combine(low, high):
+        if len(low) < len(high):
+            low, high = high, low
+        res = list(low)
+        for i, coeff in enumerate(high):
+            res[i] += coeff
+        return [coeff % modulus for coeff in res] if modulus else res
+
+    def split(start, stop, level):
+        # coeffs[start:stop] spans at most 2^level coefficients
+        if stop - start == 1:
+            return [coeffs[start]]
+        half = 1 << (level - 1)
+        if stop - start <= half:
+            return split(start, stop, level - 1)
+        return combine(split(start, start + half, level - 1),
+                       mul(split(start + half, stop, level - 1),
+                           squares[level - 1], modulus))
+
+    return split(0, len(coeffs), levels)
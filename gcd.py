@@ -0,0 +1,270 @@
+"""
+Author: Ryan Roler (ryan.roler@gmail.com)
+Greatest common divisors and square-free decomposition of dense
+coefficient sequences, lowest exponent first. Integer polynomials take a
+multi-prime modular route: the gcd is found mod several word-sized primes,
+where Euclid's algorithm is cheap and coefficients never grow, and pieced
+back together by the Chinese remainder theorem. Rational and float
+polynomials are cleared of denominators and take the same route, so no
+float ever enters a Euclidean remainder sequence.
+"""
+
+from functools import reduce
+from math import gcd as igcd, lcm as ilcm
+
+import division
+from dense import trim, sub, mul
+from domains import FLOAT, INTEGER, RATIONAL, GF, _is_prime
+
+#: Primes are drawn downward from here: below 2^31 so that products mod
+#: them stay in int64 for the NTT.
+PRIME_START = (1 << 31) - 1
+
+
+def _primes():
+    num = PRIME_START
+    while True:
+        if _is_prime(num):
+            yield num
+        num -= 2
+
+
+def derivative(coeffs, domain=INTEGER):
+    """Coefficients of the derivative"""
+    return trim(domain.reduce([i * coeffs[i] for i in range(1, len(coeffs))]))
+
+
+def content(coeffs):
+    """gcd of the integer coefficients, signed like the leading one"""
+    res = reduce(igcd, coeffs, 0)
+    return -res if coeffs and coeffs[-1] < 0 else res
+
+
+def primitive(coeffs):
+    """Integer coefficients divided by their content"""
+    cont = content(coeffs)
+    return [coeff // cont for coeff in coeffs] if cont else []
+
+
+def monic(coeffs, domain):
+    """Coefficients over a field divided by the leading one"""
+    if not coeffs:
+        return []
+    inverse = domain.quo(domain.one, coeffs[-1])
+    return domain.reduce([coeff * inverse for coeff in coeffs])
+
+
+def exact_quo(a, b, domain=INTEGER):
+    """a / b, or None if b does not divide a"""
+    quot, rem = division.divmod_(a, b, domain)
+    if trim(domain.reduce(list(rem))):
+        return None
+    return trim(domain.reduce(list(quot)))
+
+
+def _euclid(a, b, domain):
+    """Monic gcd over a field by the Euclidean algorithm"""
+    a, b = trim(list(a)), trim(list(b))
+    while b:
+        a, b = b, trim(domain.reduce(list(division.divmod_(a, b,
+                                                             domain)[1])))
+    return monic(a, domain)
+
+
+def _symmetric(coeffs, modulus):
+    half = modulus // 2
+    return [coeff - modulus if coeff > half else coeff for coeff in coeffs]
+
+
+def _crt(res, modulus, image, prime):
+    """Coefficients congruent to res mod modulus and to image mod prime"""
+    scale = pow(modulus, -1, prime)
+    return [old + modulus * ((new - old) * scale % prime)
+            for old, new in zip(res, image)]
+
+
+def int_gcd(a, b):
+    """gcd of two integer polynomials, with a positive leading coefficient.
+    The gcd of the primitive parts is found mod one prime after another,
+    made to have the gcd of their leading coefficients as its own so the
+    images agree, and lifted by CRT. Once the lift stops changing its
+    primitive part is tried as a divisor of both; a prime whose image has
+    too high a degree is unlucky and skipped.
+    """
+    a, b = trim(list(a)), trim(list(b))
+    if not a or not b:
+        return primitive(a or b)
+    cont = igcd(content(a), content(b))
+    a, b = primitive(a), primitive(b)
+    if len(a) == 1 or len(b) == 1:
+        return [cont]
+    lead = igcd(a[-1], b[-1])
+
+    res, modulus, last = None, 1, None
+    for prime in _primes():
+        if not a[-1] % prime or not b[-1] % prime:
+            continue
+        field = GF(prime)
+        image = _euclid(field.reduce(a), field.reduce(b), field)
+        if len(image) == 1:
+            return [cont]
+        image = [coeff * lead % prime for coeff in image]
+        if res is None or len(image) < len(res):
+            res, modulus = image, prime
+            last = primitive(_symmetric(image, prime))
+            continue
+        elif len(image) > len(res):
+            continue
+        res = _crt(res, modulus, image, prime)
+        modulus *= prime
+        lift = primitive(_symmetric(res, modulus))
+        if lift == last and (exact_quo(a, lift) is not None and
+                             exact_quo(b, lift) is not None):
+            return [coeff * cont for coeff in lift]
+        last = lift
+
+
+def _clear(coeffs):
+    """Rational coefficients as integers over their common denominator"""
+    denom = reduce(ilcm, (coeff.denominator for coeff in coeffs), 1)
+    return [int(coeff * denom) for coeff in coeffs]
+
+
+def _work(domain):
+    """Domain the work is done in: floats are handled as the rationals
+    they were typed in as.
+    """
+    return domain if domain.exact else RATIONAL
+
+
+def _into(coeffs, domain):
+    return trim([domain.convert(coeff) for coeff in coeffs])
+
+
+def _out(coeffs, domain):
+    return domain.storage(map(domain.convert, coeffs))
+
+
+def gcd(a, b, domain=FLOAT):
+    """Greatest common divisor: primitive with a positive leading
+    coefficient over the integers, monic over every other domain.
+    """
+    work = _work(domain)
+    a, b = _into(a, work), _into(b, work)
+    if work is INTEGER:
+        res = int_gcd(a, b)
+    elif work.modulus:
+        res = _euclid(a, b, work)
+    else:
+        res = monic(int_gcd(_clear(a), _clear(b)), work)
+    return _out(res, domain)
+
+
+def lcm(a, b, domain=FLOAT):
+    """Least common multiple, normalized the way gcd is"""
+    work = _work(domain)
+    a, b = _into(a, work), _into(b, work)
+    if not a or not b:
+        return domain.storage()
+    res = mul(exact_quo(a, gcd(a, b, work), work), b, work)
+    if work is INTEGER:
+        res = [-coeff for coeff in res] if res[-1] < 0 else res
+    else:
+        res = monic(res, work)
+    return _out(res, domain)
+
+
+def extended_gcd(a, b, domain=FLOAT):
+    """(g, s, t) with s * a + t * b = g, the monic gcd, by the extended
+    Euclidean algorithm. Integer polynomials rarely have integer
+    cofactors, so theirs are worked out, and returned, as rationals.
+    """
+    field = domain if domain.modulus else RATIONAL
+    r0, r1 = _into(a, field), _into(b, field)
+    s0, s1, t0, t1 = [field.one], [], [], [field.one]
+    while r1:
+        quot, rem = division.divmod_(r0, r1, field)
+        quot = trim(field.reduce(list(quot)))
+        r0, r1 = r1, trim(field.reduce(list(rem)))
+        s0, s1 = s1, trim(field.reduce(sub(s0, mul(quot, s1, field))))
+        t0, t1 = t1, trim(field.reduce(sub(t0, mul(quot, t1, field))))
+    if not r0:
+        s0 = []
+    else:
+        inverse = field.quo(field.one, r0[-1])
+        r0, s0, t0 = (field.reduce([coeff * inverse for coeff in seq])
+                      for seq in (r0, s0, t0))
+    out = RATIONAL if domain is INTEGER else domain
+    return _out(r0, out), _out(s0, out), _out(t0, out)
+
+
+def _yun(f):
+    """Yun's square-free decomposition of a primitive integer polynomial:
+    every gcd taken removes one from each multiplicity, so the factors
+    fall out in order of multiplicity.
+    """
+    slope = derivative(f)
+    common = int_gcd(f, slope)
+    rest = exact_quo(f, common)
+    diff = trim(sub(exact_quo(slope, common), derivative(rest)))
+    parts = []
+    mult = 1
+    while len(rest) > 1:
+        factor = int_gcd(rest, diff)
+        rest = exact_quo(rest, factor)
+        diff = trim(sub(exact_quo(diff, factor), derivative(rest)))
+        if len(factor) > 1:
+            parts.append((factor, mult))
+        mult += 1
+    return parts
+
+
+def _gf_squarefree(f, field):
+    """Square-free decomposition of a monic polynomial mod a prime p. The
+    derivative vanishes on p-th powers, so multiplicities that p divides
+    are left behind by Yun's approach; what is left is a polynomial in
+    x^p, whose p-th root is decomposed in turn.
+    """
+    prime = field.modulus
+    parts = []
+    mult = 1
+    common = _euclid(f, derivative(f, field), field)
+    rest = exact_quo(f, common, field)
+    while len(rest) > 1:
+        factor = _euclid(rest, common, field)
+        found = exact_quo(rest, factor, field)
+        if len(found) > 1:
+            parts.append((found, mult))
+        mult += 1
+        rest = factor
+        common = exact_quo(common, factor, field)
+    if len(common) > 1:
+        # Coefficients are their own p-th roots mod p
+        parts.extend((factor, mult * prime) for factor, mult in
+                     _gf_squarefree(common[::prime], field))
+    return parts
+
+
+def squarefree(coeffs, domain=FLOAT):
+    """(constant, [(factor, multiplicity), ...]) where the polynomial is
+    the constant times the product of each factor to its multiplicity.
+    The factors are square-free, pairwise coprime and normalized the way
+    gcd is, listed by increasing multiplicity.
+    """
+    work = _work(domain)
+    f = _into(coeffs, work)
+    if not f:
+        return domain.zero, []
+    if work.modulus:
+        const = f[-1]
+        parts = _gf_squarefree(monic(f, work), work)
+    elif work is INTEGER:
+        const = content(f)
+        parts = _yun(primitive(f))
+    else:
+        const = f[-1]
+        parts = [(monic(factor, work), mult)
+                 for factor, mult in _yun(primitive(_clear(f)))]
+    return (domain.convert(const),
+            [(_out(factor, domain), mult)
+             for factor, mult in sorted(parts, key=lambda part: part[1])])
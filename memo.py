@@ -0,0 +1,72 @@
+"""
+Author: Ryan Roler (ryan.roler@gmail.com)
+Least recently used cache of polynomial operation results. Entries are
+keyed on the operation and the binary records of both operands (see
+binary.py), which are canonical, compare as flat bytes and make it easy
+to count the memory an entry holds. Results are kept as records too, so
+every hit hands out fresh objects that can be changed in place without
+touching the cache.
+"""
+
+from collections import OrderedDict
+
+#: Default bounds on the number of entries and on the bytes of records
+#: they hold.
+MAXSIZE = 1024
+MAXBYTES = 64 << 20
+
+
+class OpCache():
+    """LRU cache bounded both by entries and by the bytes of the operand
+    and result records it holds. hits, misses and evictions count what
+    it has done; see stats.
+    """
+
+    def __init__(self, maxsize=MAXSIZE, maxbytes=MAXBYTES):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.clear()
+
+    def clear(self):
+        """Drop every entry and reset the counts"""
+        self._entries = OrderedDict()
+        self.nbytes = 0
+        self.hits = self.misses = self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """Counts and current size, as a dict"""
+        total = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'entries': len(self._entries),
+                'bytes': self.nbytes,
+                'hit_rate': self.hits / total if total else 0.0}
+
+    def lookup(self, key, compute, pack, unpack):
+        """Result for key, a tuple of the operation and records, computing
+        and storing it on a miss. pack turns a result into a tuple of
+        records, or None if it has none, and unpack turns one back.
+        """
+        entries = self._entries
+        found = entries.get(key)
+        if found is not None:
+            self.hits += 1
+            entries.move_to_end(key)
+            return unpack(found)
+        self.misses += 1
+        res = compute()
+        records = pack(res)
+        if records is None:
+            return res
+        size = sum(map(len, key)) + sum(map(len, records))
+        if size > self.maxbytes:
+            return res
+        entries[key] = records
+        self.nbytes += size
+        while len(entries) > self.maxsize or self.nbytes > self.maxbytes:
+            old_key, old = entries.popitem(last=False)
+            self.nbytes -= sum(map(len, old_key)) + sum(map(len, old))
+            self.evictions += 1
+        return res
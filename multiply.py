@@ -0,0 +1,289 @@
+"""
+Author: Ryan Roler (ryan.roler@gmail.com)
+Multiplication engine for dense coefficient sequences. Picks schoolbook,
+Karatsuba, Kronecker substitution, FFT or NTT convolution by operand size
+and coefficient type.
+"""
+
+from fractions import Fraction
+from math import frexp, lcm
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+#: Operands with at most this many coefficients use schoolbook products.
+SCHOOLBOOK_CUTOFF = 24
+#: Float operands at least this long go through numpy's FFT when present.
+FFT_CUTOFF = 256
+#: Products mod a prime at least this long go through numpy's NTT when
+#: present, if the prime is NTT-friendly and small enough for int64.
+NTT_CUTOFF = 512
+#: Whole-number floats up to this magnitude are exactly the ints they
+#: hold; larger ones are too coarse for exact products to be worth it.
+FLOAT_EXACT = 2 ** 53
+
+
+def schoolbook(a, b):
+    """Quadratic product, fastest for short operands"""
+    res = [a[0] * 0] * (len(a) + len(b) - 1)
+    for i, x in enumerate(a):
+        if x:
+            for j, y in enumerate(b):
+                res[i + j] += x * y
+    return res
+
+
+def _add(a, b):
+    if len(a) < len(b):
+        a, b = b, a
+    res = list(a)
+    for i, coeff in enumerate(b):
+        res[i] += coeff
+    return res
+
+
+def karatsuba(a, b):
+    """Karatsuba product: three half-size products per split instead of
+    four. Works for any coefficient type supporting + - and *.
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    if len(b) <= SCHOOLBOOK_CUTOFF:
+        return schoolbook(a, b)
+
+    res = [a[0] * 0] * (len(a) + len(b) - 1)
+    if 2 * len(b) <= len(a):
+        # Unbalanced operands: multiply b by a in chunks of its own size
+        for start in range(0, len(a), len(b)):
+            chunk = karatsuba(a[start:start + len(b)], b)
+            for i, coeff in enumerate(chunk, start):
+                res[i] += coeff
+        return res
+
+    half = len(a) // 2
+    a0, a1, b0, b1 = a[:half], a[half:], b[:half], b[half:]
+    low = karatsuba(a0, b0)
+    high = karatsuba(a1, b1)
+    mid = karatsuba(_add(a0, a1), _add(b0, b1))
+    for i, coeff in enumerate(low):
+        res[i] += coeff
+        res[i + half] -= coeff
+    for i, coeff in enumerate(high):
+        res[i + 2 * half] += coeff
+        res[i + half] -= coeff
+    for i, coeff in enumerate(mid):
+        res[i + half] += coeff
+    return res
+
+
+def _pack(seq, width):
+    """Pack non-negative ints into one big int, width bytes apiece"""
+    return int.from_bytes(b''.join(num.to_bytes(width, 'little')
+                                   for num in seq), 'little')
+
+
+def kronecker(a, b):
+    """Exact product of integer sequences by Kronecker substitution: each
+    operand is packed into one big int, the big ints are multiplied with
+    Python's native bignum arithmetic, and the coefficients are read back
+    out of the digits of the result.
+    """
+    size = len(a) + len(b) - 1
+    bound = (max(map(abs, a)) * max(map(abs, b)) * min(len(a), len(b)))
+    if not bound:
+        return [0] * size
+    width = bound.bit_length() // 8 + 1  # One spare bit for the sign
+
+    def pack(seq):
+        return (_pack((num if num > 0 else 0 for num in seq), width) -
+                _pack((-num if num < 0 else 0 for num in seq), width))
+
+    # Offsetting every digit by half its range keeps them all non-negative
+    half = 1 << (8 * width - 1)
+    offset = int.from_bytes(half.to_bytes(width, 'little') * size, 'little')
+    raw = (pack(a) * pack(b) + offset).to_bytes(width * size, 'little')
+    return [int.from_bytes(raw[i:i + width], 'little') - half
+            for i in range(0, width * size, width)]
+
+
+def fft(a, b):
+    """Float product by FFT convolution, needs numpy. Both operands are
+    scaled by powers of two to at most one first, so that coefficients
+    whose product fits cannot overflow inside the transforms.
+    """
+    size = len(a) + len(b) - 1
+    n = 1 << (size - 1).bit_length()
+    a, b = numpy.asarray(a, dtype=float), numpy.asarray(b, dtype=float)
+    scale_a = frexp(numpy.abs(a).max())[1]
+    scale_b = frexp(numpy.abs(b).max())[1]
+    # Products past the float range go to inf as they would unscaled
+    with numpy.errstate(over='ignore', invalid='ignore'):
+        prod = (numpy.fft.rfft(numpy.ldexp(a, -scale_a), n) *
+                numpy.fft.rfft(numpy.ldexp(b, -scale_b), n))
+        res = numpy.fft.irfft(prod, n)[:size]
+        return numpy.ldexp(res, scale_a + scale_b).tolist()
+
+
+_GENERATORS = {}
+
+
+def _generator(modulus):
+    """Smallest generator of the multiplicative group mod a prime"""
+    if modulus not in _GENERATORS:
+        factors, rest, div = set(), modulus - 1, 2
+        while div * div <= rest:
+            while not rest % div:
+                factors.add(div)
+                rest //= div
+            div += 1
+        if rest > 1:
+            factors.add(rest)
+        gen = 2
+        while any(pow(gen, (modulus - 1) // fac, modulus) == 1
+                  for fac in factors):
+            gen += 1
+        _GENERATORS[modulus] = gen
+    return _GENERATORS[modulus]
+
+
+def ntt_root(modulus, size):
+    """Primitive size-th root of unity mod a prime, or None if there is
+    none. NTT-friendly primes such as 998244353 = 119 * 2^23 + 1 have
+    roots for every power of two size up to a large bound.
+    """
+    if (modulus - 1) % size:
+        return None
+    return pow(_generator(modulus), (modulus - 1) // size, modulus)
+
+
+def _ntt(values, root, modulus):
+    """Iterative number theoretic transform of an int64 numpy array whose
+    length is a power of two. Each butterfly stage runs as whole-array
+    operations over every block at once.
+    """
+    size = len(values)
+    bits = size.bit_length() - 1
+    index = numpy.arange(size)
+    rev = numpy.zeros(size, dtype=numpy.int64)
+    for bit in range(bits):
+        rev |= ((index >> bit) & 1) << (bits - 1 - bit)
+    values = values[rev]
+
+    length = 2
+    while length <= size:
+        half = length // 2
+        step = pow(root, size // length, modulus)
+        twiddles = numpy.ones(half, dtype=numpy.int64)
+        filled = 1
+        while filled < half:
+            twiddles[filled:2 * filled] = (twiddles[:filled] *
+                                           pow(step, filled, modulus) %
+                                           modulus)
+            filled *= 2
+        blocks = values.reshape(-1, length)
+        low = blocks[:, :half].copy()
+        high = blocks[:, half:] * twiddles % modulus
+        blocks[:, :half] = (low + high) % modulus
+        blocks[:, half:] = (low - high) % modulus
+        length *= 2
+    return values
+
+
+def ntt(a, b, modulus):
+    """Product of two sequences of ints in range(modulus) by NTT
+    convolution. Needs numpy, a prime below 2^31 so that products fit in
+    int64, and one with a root of unity for the padded size.
+    """
+    size = len(a) + len(b) - 1
+    n = 1 << (size - 1).bit_length()
+    root = ntt_root(modulus, n)
+    fa = numpy.zeros(n, dtype=numpy.int64)
+    fb = numpy.zeros(n, dtype=numpy.int64)
+    fa[:len(a)] = a
+    fb[:len(b)] = b
+    prod = (_ntt(fa, root, modulus) * _ntt(fb, root, modulus) % modulus)
+    res = _ntt(prod, pow(root, -1, modulus), modulus)
+    return (res[:size] * pow(n, -1, modulus) % modulus).tolist()
+
+
+def _integral(seq):
+    """The sequence as ints if every coefficient is a whole number, floats
+    no larger than FLOAT_EXACT, otherwise None.
+    """
+    res = []
+    for coeff in seq:
+        if isinstance(coeff, int):
+            res.append(coeff)
+        elif (isinstance(coeff, float) and coeff.is_integer() and
+              abs(coeff) <= FLOAT_EXACT):
+            res.append(int(coeff))
+        else:
+            return None
+    return res
+
+
+def _float(num):
+    """int to float, overflowing to infinity as float arithmetic does"""
+    try:
+        return float(num)
+    except OverflowError:
+        return float('inf') if num > 0 else float('-inf')
+
+
+def _rational(seq):
+    """(ints, denominator) such that the sequence is ints / denominator,
+    if every coefficient is an int or Fraction, otherwise None.
+    """
+    denom = 1
+    for coeff in seq:
+        if isinstance(coeff, Fraction):
+            denom = lcm(denom, coeff.denominator)
+        elif not isinstance(coeff, int):
+            return None
+    return [int(coeff * denom) for coeff in seq], denom
+
+
+def mul(a, b, modulus=None):
+    """Product of two coefficient sequences, lowest exponent first.
+    Whole-number coefficients are multiplied exactly, even when stored as
+    floats up to FLOAT_EXACT, so integer products pick up no rounding.
+    Fractions are put over a common denominator and multiplied exactly
+    the same way. Given a prime modulus, coefficients must be ints in
+    range(modulus) and the product comes back reduced.
+    """
+    if not len(a) or not len(b):
+        return []
+    a, b = list(a), list(b)
+    if modulus:
+        if (numpy is not None and modulus < 1 << 31 and
+                min(len(a), len(b)) >= NTT_CUTOFF and
+                ntt_root(modulus, 1 << (len(a) + len(b) - 2).bit_length())):
+            return ntt(a, b, modulus)
+        elif min(len(a), len(b)) <= SCHOOLBOOK_CUTOFF:
+            res = schoolbook(a, b)
+        else:
+            res = kronecker(a, b)
+        return [coeff % modulus for coeff in res]
+    if min(len(a), len(b)) <= SCHOOLBOOK_CUTOFF:
+        return schoolbook(a, b)
+
+    exact_a = _integral(a)
+    exact_b = _integral(b) if exact_a is not None else None
+    if exact_b is not None:
+        res = kronecker(exact_a, exact_b)
+        if isinstance(a[0], float) or isinstance(b[0], float):
+            res = [_float(coeff) for coeff in res]
+        return res
+
+    exact_a = _rational(a)
+    exact_b = _rational(b) if exact_a is not None else None
+    if exact_b is not None:
+        denom = exact_a[1] * exact_b[1]
+        return [Fraction(coeff, denom)
+                for coeff in kronecker(exact_a[0], exact_b[0])]
+    elif (numpy is not None and len(a) + len(b) >= FFT_CUTOFF and
+          all(isinstance(coeff, float) for coeff in a + b)):
+        return fft(a, b)
+    return karatsuba(a, b)
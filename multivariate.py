@@ -0,0 +1,408 @@
+"""
+Author: Ryan Roler (ryan.roler@gmail.com)
+Multivariate polynomials. Terms are kept in a dict keyed by monomial, a
+tuple with one exponent per variable: 3x^2y - z + 1 over ('x', 'y', 'z')
+is {(2, 1, 0): 3, (0, 0, 1): -1, (0, 0, 0): 1}. Terms are listed in a
+chosen monomial order: lex, grlex or grevlex.
+"""
+
+from fractions import Fraction
+from heapq import heappop, heappush
+import re
+import sys
+
+import domains
+import multiply
+
+
+def lex(monom):
+    """Lexicographic order: compare exponents of the first variable, then
+    the second, and so on.
+    """
+    return monom
+
+
+def grlex(monom):
+    """Graded lexicographic order: total degree first, lex to break ties"""
+    return sum(monom), monom
+
+
+def grevlex(monom):
+    """Graded reverse lexicographic order: total degree first, then the
+    smaller exponent of the last variable wins, then of the one before.
+    """
+    return sum(monom), tuple(-expo for expo in reversed(monom))
+
+
+ORDERS = {'lex': lex, 'grlex': grlex, 'grevlex': grevlex}
+
+#: Products are multiplied as dense univariate arrays of packed monomials,
+#: see multiply.mul, when the arrays hold at most this many slots per pair
+#: of terms multiplied; sparser products go through a heap merge.
+PACKED_RATIO = 1
+
+
+def _radices(a, b, nvars):
+    """Per-variable bound on the exponents of the product of a and b, so
+    monomials can be packed into one int in mixed radix without carries.
+    """
+    radices = []
+    for i in range(nvars):
+        radices.append(max(monom[i] for monom in a) +
+                       max(monom[i] for monom in b) + 1)
+    return radices
+
+
+def _pack(monom, radices):
+    """Monomial as one int, first variable most significant, so packed
+    monomials multiply by adding and compare in lex order.
+    """
+    key = 0
+    for expo, radix in zip(monom, radices):
+        key = key * radix + expo
+    return key
+
+
+def _unpack(key, radices):
+    monom = []
+    for radix in reversed(radices):
+        key, expo = divmod(key, radix)
+        monom.append(expo)
+    return tuple(reversed(monom))
+
+
+def heap_mul(a, b):
+    """Product of two lists of (packed monomial, coefficient) pairs in
+    descending order, as another such list. Johnson's algorithm: a heap
+    holds at most one pending product per term of a, so the products come
+    out in order, each like monomial right after the last, with O(len(a))
+    memory rather than one slot per product.
+    """
+    if len(a) > len(b):
+        a, b = b, a
+    heap = [(-(a[0][0] + b[0][0]), 0, 0)]
+    keys, coeffs = [], []
+    while heap:
+        key, i, j = heappop(heap)
+        if j + 1 < len(b):
+            heappush(heap, (-(a[i][0] + b[j + 1][0]), i, j + 1))
+        if not j and i + 1 < len(a):
+            heappush(heap, (-(a[i + 1][0] + b[0][0]), i + 1, 0))
+        coeff = a[i][1] * b[j][1]
+        if keys and keys[-1] == -key:
+            coeffs[-1] += coeff
+        else:
+            keys.append(-key)
+            coeffs.append(coeff)
+    return list(zip(keys, coeffs))
+
+
+def packed_mul(a, b, domain):
+    """Product of two lists of (packed monomial, coefficient) pairs by
+    Kronecker substitution: the packed monomials are exponents of a
+    single variable, so multiply.mul does the work on dense arrays.
+    """
+    size_a = max(key for key, coeff in a) + 1
+    size_b = max(key for key, coeff in b) + 1
+    dense_a = [domain.zero] * size_a
+    dense_b = [domain.zero] * size_b
+    for key, coeff in a:
+        dense_a[key] = coeff
+    for key, coeff in b:
+        dense_b[key] = coeff
+    prod = multiply.mul(dense_a, dense_b, domain.modulus)
+    return [(key, coeff) for key, coeff in enumerate(prod) if coeff]
+
+
+def _format_coeff(coeff):
+    if isinstance(coeff, float) and not coeff.is_integer():
+        return "{:.3}".format(coeff)
+    elif isinstance(coeff, Fraction) and coeff.denominator > 1:
+        return str(coeff)
+    return str(int(coeff))
+
+
+_MONOMIAL = re.compile(r'([+-]?)(\d*\.?\d*)((?:[a-z]\^?\d*)*)$')
+_FACTOR = re.compile(r'([a-z])\^?(\d*)')
+
+
+class MPoly():
+    """MPoly objects represent polynomials in several variables.
+    They are immutable: every operation returns a new MPoly.
+    Variables are single letters, given in order as gens, e.g. 'xyz'.
+    """
+
+    def __init__(self, gens, terms=(), order='lex', domain=None):
+        """terms is a dict or iterable of (MONOMIAL, COEFFICIENT) pairs,
+        each monomial a tuple of non-negative exponents, one per gen.
+        Repeated monomials are summed and zero terms dropped. Coefficients
+        are converted into the domain, float by default; see
+        domains.get_domain.
+        """
+        if order not in ORDERS:
+            raise ValueError("Unknown monomial order ({})".format(order))
+        self.gens = tuple(sys.intern(var.lower()) for var in gens)
+        if len(set(self.gens)) != len(self.gens):
+            raise ValueError("Repeated variables ({})".format(gens))
+        self.order = order
+        self.domain = domains.get_domain(domain)
+
+        convert = self.domain.convert
+        merged = {}
+        for monom, coeff in (terms.items() if isinstance(terms, dict)
+                             else terms):
+            monom = tuple(monom)
+            if len(monom) != len(self.gens) or min(monom, default=0) < 0:
+                raise ValueError("Monomial {} does not fit variables {}"
+                                 .format(monom, self.gens))
+            merged[monom] = (merged.get(monom, self.domain.zero) +
+                             convert(coeff))
+        self.terms = self.__nonzero(merged, self.domain)
+
+    @staticmethod
+    def __nonzero(terms, domain):
+        modulus = domain.modulus
+        if modulus:
+            return {monom: coeff % modulus for monom, coeff in terms.items()
+                    if coeff % modulus}
+        return {monom: coeff for monom, coeff in terms.items() if coeff}
+
+    def __new(self, terms, gens=None, domain=None):
+        """MPoly in this one's order, by default over its gens and domain,
+        from a dict of monomials with coefficients already in the domain.
+        """
+        poly = MPoly.__new__(MPoly)
+        poly.gens = self.gens if gens is None else gens
+        poly.order = self.order
+        poly.domain = self.domain if domain is None else domain
+        poly.terms = self.__nonzero(terms, poly.domain)
+        return poly
+
+    @classmethod
+    def from_terms(cls, terms, gens=None, order='lex', domain=None):
+        """Build from Term objects, or a Poly holding them, which is read
+        as the sum of its terms. gens defaults to their variables in
+        alphabetical order.
+        """
+        terms = list(terms)
+        if gens is None:
+            gens = sorted({term.var for term in terms if term.var})
+        gens = tuple(gens)
+        items = []
+        for term in terms:
+            monom = [0] * len(gens)
+            if term.var:
+                if not isinstance(term.expo, int) or term.expo < 0:
+                    raise ValueError("{} is not a monomial".format(term))
+                monom[gens.index(term.var)] = term.expo
+            items.append((tuple(monom), term.coeff))
+        return cls(gens, items, order, domain)
+
+    @classmethod
+    def parse(cls, inpt, gens=None, order='lex', domain=None):
+        """Parse terms separated by spaces, the way parse_poly does, where
+        a term may hold several variables: 3x^2y - yz + 1
+        """
+        terms = []
+        sign = 1
+        for item in inpt.lower().split():
+            if item == '+':
+                continue
+            elif item == '-':
+                sign = -1
+                continue
+            found = _MONOMIAL.match(item)
+            if not found or not (found.group(2) or found.group(3)):
+                raise SyntaxError("Improper input formatting ({})"
+                                  .format(item))
+            num = found.group(2)
+            if not num:
+                coeff = 1
+            elif '.' in num:
+                coeff = float(num)
+            else:
+                coeff = int(num)
+            if found.group(1) == '-':
+                coeff = -coeff
+            powers = {}
+            for var, expo in _FACTOR.findall(found.group(3)):
+                powers[var] = powers.get(var, 0) + int(expo or 1)
+            terms.append((powers, sign * coeff))
+            sign = 1
+
+        if gens is None:
+            gens = sorted({var for powers, coeff in terms for var in powers})
+        gens = tuple(gens)
+        items = []
+        for powers, coeff in terms:
+            if not set(powers) <= set(gens):
+                raise ValueError("Variables {} not among {}".format(
+                                 sorted(powers), gens))
+            items.append((tuple(powers.get(var, 0) for var in gens), coeff))
+        return cls(gens, items, order, domain)
+
+    def __repr__(self):
+        return "MPoly({!r}, {!r}, {!r}, {!r})".format(
+            ''.join(self.gens), self.terms, self.order, self.domain)
+
+    def __str__(self):
+        rep = []
+        for monom, coeff in self:
+            factors = ''.join(var + ('^' + str(expo) if expo > 1 else '')
+                              for var, expo in zip(self.gens, monom) if expo)
+            text = _format_coeff(abs(coeff))
+            if factors and text == '1':
+                text = ''
+            if coeff < 0:
+                rep.append('-' + text + factors if not rep else
+                           '- ' + text + factors)
+            else:
+                rep.append(text + factors if not rep else
+                           '+ ' + text + factors)
+        return ' '.join(rep) or '0'
+
+    def __len__(self):
+        return len(self.terms)
+
+    def __iter__(self):
+        """(monomial, coefficient) pairs, leading term first"""
+        key = ORDERS[self.order]
+        return ((monom, self.terms[monom])
+                for monom in sorted(self.terms, key=key, reverse=True))
+
+    def __eq__(self, other):
+        if isinstance(other, MPoly):
+            gens, mine, theirs = self.__align(other)
+            return mine == theirs
+        elif isinstance(other, (int, float, Fraction)):
+            return self.terms == ({(0,) * len(self.gens): other}
+                                  if other else {})
+        return NotImplemented
+
+    def with_order(self, order):
+        """The same polynomial listed in another monomial order"""
+        if order not in ORDERS:
+            raise ValueError("Unknown monomial order ({})".format(order))
+        poly = self.__new(self.terms)
+        poly.order = order
+        return poly
+
+    def to_domain(self, domain):
+        """The same polynomial with its coefficients converted"""
+        return MPoly(self.gens, self.terms, self.order, domain)
+
+    @property
+    def degree(self):
+        """Total degree"""
+        return max((sum(monom) for monom in self.terms), default=0)
+
+    def degree_in(self, var):
+        """Highest exponent of one variable"""
+        i = self.gens.index(var)
+        return max((monom[i] for monom in self.terms), default=0)
+
+    def leading(self):
+        """(monomial, coefficient) of the leading term in the poly's order"""
+        if not self.terms:
+            return (0,) * len(self.gens), self.domain.zero
+        monom = max(self.terms, key=ORDERS[self.order])
+        return monom, self.terms[monom]
+
+    def __align(self, other):
+        """Both term dicts over a common tuple of gens: self's, followed
+        by any of other's it lacks. Coefficients meet in a common domain.
+        """
+        domain = domains.unify(self.domain, other.domain)
+        gens = self.gens + tuple(var for var in other.gens
+                                 if var not in self.gens)
+        mine = self.__widen(self.terms, self.gens, gens, domain)
+        theirs = self.__widen(other.terms, other.gens, gens, domain)
+        return gens, mine, theirs
+
+    @staticmethod
+    def __widen(terms, old, new, domain):
+        if old == new:
+            return {monom: domain.convert(coeff)
+                    for monom, coeff in terms.items()}
+        where = [new.index(var) for var in old]
+        res = {}
+        for monom, coeff in terms.items():
+            wide = [0] * len(new)
+            for i, expo in zip(where, monom):
+                wide[i] = expo
+            res[tuple(wide)] = domain.convert(coeff)
+        return res
+
+    def __coerce(self, other):
+        """Other as an MPoly, if it is one or a plain number"""
+        if isinstance(other, MPoly):
+            return other
+        elif isinstance(other, (int, float, Fraction)):
+            return MPoly(self.gens, {(0,) * len(self.gens): other},
+                         self.order, domains.of(other))
+        return None
+
+    def __join(self, other, sign):
+        other = self.__coerce(other)
+        if other is None:
+            return NotImplemented
+        gens, res, theirs = self.__align(other)
+        for monom, coeff in theirs.items():
+            res[monom] = res.get(monom, 0) + sign * coeff
+        return self.__new(res, gens, domains.unify(self.domain,
+                                                   other.domain))
+
+    def __add__(self, other):
+        return self.__join(other, 1)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        return self.__join(other, -1)
+
+    def __rsub__(self, other):
+        return -self + other
+
+    def __neg__(self):
+        return self.__new({monom: -coeff
+                           for monom, coeff in self.terms.items()})
+
+    def __mul__(self, other):
+        other = self.__coerce(other)
+        if other is None:
+            return NotImplemented
+        gens, mine, theirs = self.__align(other)
+        domain = domains.unify(self.domain, other.domain)
+        if not mine or not theirs:
+            res = {}
+        else:
+            radices = _radices(mine, theirs, len(gens))
+            a = sorted(((_pack(monom, radices), coeff)
+                        for monom, coeff in mine.items()), reverse=True)
+            b = sorted(((_pack(monom, radices), coeff)
+                        for monom, coeff in theirs.items()), reverse=True)
+            if a[0][0] + b[0][0] + 2 <= PACKED_RATIO * len(a) * len(b):
+                prod = packed_mul(a, b, domain)
+            else:
+                prod = heap_mul(a, b)
+            res = {_unpack(key, radices): coeff for key, coeff in prod}
+        return self.__new(res, gens, domain)
+
+    __rmul__ = __mul__
+
+    def plug(self, *values):
+        """Evaluate with one value per gen, in order"""
+        if len(values) != len(self.gens):
+            raise ValueError("Expected {} values".format(len(self.gens)))
+        powers = [{} for var in self.gens]
+        res = 0
+        for monom, coeff in self.terms.items():
+            for i, expo in enumerate(monom):
+                if expo and expo not in powers[i]:
+                    powers[i][expo] = values[i] ** expo
+                if expo:
+                    coeff = coeff * powers[i][expo]
+            res += coeff
+        if self.domain.modulus:
+            res %= self.domain.modulus
+        return res
@@ -0,0 +1,148 @@
+"""
+Author: Ryan Roler (ryan.roler@gmail.com)
+Opt-in parallel execution over a pool of worker processes. Products of
+two long dense polys are split into blocks of the longer operand, whose
+products with the other are worked out by different workers and added
+back together at their offsets. Batches of independent operations are
+cut into runs of pairs, one run per task.
+
+Polys cross between processes as the binary records of binary.py, packed
+back to back into one bytes object per task, never as pickled Terms.
+Polys held as Terms have no record and are worked out in this process.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import operator
+import os
+
+import binary
+import multiply
+from dense import Dense
+from polynator import Poly
+
+#: Products are split only when the shorter operand has at least this
+#: many coefficients; below it the pool costs more than it saves.
+THRESHOLD = 2048
+#: Pairs per task for batch operations, and the fewest pairs worth
+#: sending to the pool at all.
+CHUNK = 256
+
+OPERATIONS = {'+': operator.add, '-': operator.sub, '*': operator.mul,
+              '/': operator.truediv, '%': operator.mod, 'divmod': divmod,
+              'gcd': Poly.gcd}
+
+
+def _records(buffer):
+    """Every array backend in a buffer of records packed back to back"""
+    offset = 0
+    while offset < len(buffer):
+        rep, offset = binary.unpack(buffer, offset)
+        yield rep
+
+
+def _mul_block(block, other):
+    """Record of the product of two dense records"""
+    (a,), (b,) = _records(block), _records(other)
+    domain = a.domain
+    coeffs = multiply.mul(a.coeffs, b.coeffs, domain.modulus)
+    return binary.pack(Dense(domain.storage(coeffs), a.var, domain))
+
+
+def _run_batch(name, buffer):
+    """Records of op applied to each pair of records in the buffer; both
+    records of a divmod result are written, quotient first.
+    """
+    op = OPERATIONS[name]
+    reps = _records(buffer)
+    res = []
+    for a in reps:
+        found = op(Poly._from_rep(a), Poly._from_rep(next(reps)))
+        for poly in (found if isinstance(found, tuple) else (found,)):
+            res.append(poly.to_bytes())
+    return b''.join(res)
+
+
+class Executor():
+    """Runs large products and batches of operations on a
+    concurrent.futures process pool. Without one, a pool of workers
+    processes (all cores by default) is started and shut down by close.
+    Products whose shorter operand is under threshold coefficients, and
+    batches under chunk pairs, are worked out in this process.
+    """
+
+    def __init__(self, pool=None, workers=None, threshold=THRESHOLD,
+                 chunk=CHUNK):
+        self.workers = workers or os.cpu_count() or 1
+        self._owned = pool is None
+        self.pool = ProcessPoolExecutor(self.workers) if pool is None \
+            else pool
+        self.threshold = threshold
+        self.chunk = chunk
+
+    def close(self):
+        """Shut down the pool if the executor started it"""
+        if self._owned:
+            self.pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def mul(self, a, b):
+        """a * b, with the work split across the pool when both polys are
+        dense and long enough.
+        """
+        pair = a._pair(b) if isinstance(b, Poly) else None
+        if (not pair or not all(isinstance(rep, Dense) for rep in pair) or
+                min(map(len, pair)) < self.threshold):
+            return a * b
+        big, small = sorted(pair, key=len, reverse=True)
+        domain, var = big.domain, big.var or small.var
+        step = max(-(-len(big) // self.workers), self.threshold)
+        other = binary.pack(small)
+        futures = [(start, self.pool.submit(
+                        _mul_block, binary.pack(Dense(
+                            big.coeffs[start:start + step], var, domain)),
+                        other))
+                   for start in range(0, len(big), step)]
+        res = domain.storage([domain.zero]) * (len(big) + len(small) - 1)
+        for start, future in futures:
+            (block,) = _records(future.result())
+            for i, coeff in enumerate(block.coeffs, start):
+                res[i] += coeff
+        return Poly._from_rep(Dense(domain.reduce(res), var, domain))
+
+    def map(self, op, polys, others):
+        """op applied to each pair of polys and others, as a list: one of
+        '+', '-', '*', '/', '%', 'divmod' or 'gcd'. divmod gives
+        (quotient, remainder) tuples.
+        """
+        if op not in OPERATIONS:
+            raise ValueError("Unknown batch operation ({})".format(op))
+        pairs = list(zip(polys, others))
+        func = OPERATIONS[op]
+        if len(pairs) < self.chunk:
+            return [func(a, b) for a, b in pairs]
+
+        res = [None] * len(pairs)
+        tasks = []
+        for start in range(0, len(pairs), self.chunk):
+            index, records = [], []
+            for i in range(start, min(start + self.chunk, len(pairs))):
+                a, b = pairs[i]
+                if a._rep is None or b._rep is None:
+                    res[i] = func(a, b)
+                else:
+                    index.append(i)
+                    records += (a.to_bytes(), b.to_bytes())
+            if index:
+                tasks.append((index, self.pool.submit(
+                    _run_batch, op, b''.join(records))))
+        for index, future in tasks:
+            found = map(Poly._from_rep, _records(future.result()))
+            for i in index:
+                res[i] = (next(found), next(found)) if op == 'divmod' \
+                    else next(found)
+        return res
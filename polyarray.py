@@ -0,0 +1,279 @@
+"""
+Author: Ryan Roler (ryan.roler@gmail.com)
+Batches of small polynomials held as the rows of one 2-D numpy array, so
+that an operation on thousands of them is a handful of whole-array
+operations rather than thousands of Poly method calls. Needs numpy.
+"""
+
+from array import array
+from functools import reduce
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+import domains
+from dense import Dense
+from polynator import Poly
+
+#: Float products at least this many coefficients wide go through numpy's
+#: FFT along the rows instead of shifted row updates.
+FFT_WIDTH = 64
+
+
+def _trim(coeffs):
+    """Drop trailing columns that are zero in every row, keeping one"""
+    filled = numpy.flatnonzero(coeffs.any(axis=0))
+    width = filled[-1] + 1 if len(filled) else 1
+    return coeffs[:, :width] if width < coeffs.shape[1] else coeffs
+
+
+def _degrees(coeffs):
+    """Degree of every row, -1 for zero rows"""
+    nonzero = coeffs != 0
+    last = coeffs.shape[1] - 1 - numpy.argmax(nonzero[:, ::-1], axis=1)
+    return numpy.where(nonzero.any(axis=1), last, -1)
+
+
+def _inverse(values, modulus):
+    """Inverses of an int64 array mod a prime below 2^31, by Fermat's
+    little theorem with square and multiply over the whole array.
+    """
+    res = numpy.ones_like(values)
+    base = values % modulus
+    power = modulus - 2
+    while power:
+        if power & 1:
+            res = res * base % modulus
+        base = base * base % modulus
+        power >>= 1
+    return res
+
+
+class PolyArray():
+    """Polynomials in one variable and domain held as the rows of a 2-D
+    numpy array, lowest exponent first: row i, column j holds the
+    coefficient of x^j in the i-th poly. Float coefficients are held as
+    float64 and GF(p) ones as int64, for primes below 2^31 so that every
+    product of two fits.
+    """
+
+    __slots__ = ('coeffs', 'var', 'domain')
+
+    def __init__(self, coeffs, var='x', domain=None):
+        """A float64 array, or an int64 one over GF(p), is used as it is
+        rather than copied.
+        """
+        if numpy is None:
+            raise ValueError("PolyArray needs numpy")
+        domain = domains.get_domain(domain)
+        if domain.modulus:
+            if domain.modulus >= 1 << 31:
+                raise ValueError("PolyArray needs primes below 2^31, not {}"
+                                 .format(domain.modulus))
+            coeffs = numpy.asarray(coeffs, dtype=numpy.int64)
+            if coeffs.size and (coeffs.min() < 0 or
+                                coeffs.max() >= domain.modulus):
+                coeffs = coeffs % domain.modulus
+        elif domain is domains.FLOAT:
+            coeffs = numpy.asarray(coeffs, dtype=float)
+        else:
+            raise ValueError("PolyArray holds float or GF(p) coefficients, "
+                             "not {}".format(domain))
+        if coeffs.ndim != 2:
+            raise ValueError("PolyArray needs a 2-D array of coefficients")
+        if not coeffs.shape[1]:
+            coeffs = numpy.zeros((len(coeffs), 1), dtype=coeffs.dtype)
+        self.coeffs = _trim(coeffs)
+        self.var = var
+        self.domain = domain
+
+    @classmethod
+    def from_polys(cls, polys, var=None, domain=None):
+        """Rows of the polys' coefficients, in the domain given, or else
+        the GF(p) they share or float.
+        """
+        polys = list(polys)
+        if domain is None and polys:
+            domain = reduce(domains.unify, (poly.domain for poly in polys))
+            if not domain.modulus:
+                domain = domains.FLOAT
+        domain = domains.get_domain(domain)
+        rows = []
+        for poly in polys:
+            found, own, (coeffs,) = poly._coeffs()
+            var = var or found
+            rows.append(coeffs if own is domain else
+                        list(map(domain.convert, coeffs)))
+        width = max(map(len, rows), default=1) or 1
+        dtype = numpy.int64 if domain.modulus else float
+        matrix = numpy.zeros((len(rows), width), dtype=dtype)
+        for row, coeffs in zip(matrix, rows):
+            row[:len(coeffs)] = coeffs
+        return cls(matrix, var or 'x', domain)
+
+    def to_polys(self):
+        """One Poly per row"""
+        return [self[i] for i in range(len(self))]
+
+    def __len__(self):
+        return len(self.coeffs)
+
+    def __repr__(self):
+        return "PolyArray({!r}, {!r}, {!r})".format(
+            self.coeffs.tolist(), self.var, self.domain)
+
+    def __getitem__(self, index):
+        """Poly for an int, PolyArray for a slice or index array"""
+        if isinstance(index, (int, numpy.integer)):
+            row = self.coeffs[index]
+            if self.domain.modulus:
+                coeffs = row.tolist()
+            else:
+                coeffs = array('d')
+                coeffs.frombytes(numpy.ascontiguousarray(row).tobytes())
+            return Poly._from_rep(Dense(coeffs, self.var, self.domain))
+        return PolyArray(self.coeffs[index], self.var, self.domain)
+
+    @property
+    def degrees(self):
+        """Degree of every poly, 0 for zero polys"""
+        return numpy.maximum(_degrees(self.coeffs), 0)
+
+    def __check(self, other):
+        if not isinstance(other, PolyArray):
+            raise TypeError("PolyArrays only combine with PolyArrays")
+        if len(other) != len(self):
+            raise ValueError("PolyArrays of {} and {} polys do not pair up"
+                             .format(len(self), len(other)))
+        if other.domain is not self.domain:
+            raise ValueError("Cannot mix {} and {} coefficients".format(
+                             self.domain, other.domain))
+        if other.var != self.var:
+            raise ValueError("Cannot mix variables {} and {}".format(
+                             self.var, other.var))
+
+    def __join(self, coeffs):
+        if self.domain.modulus:
+            coeffs %= self.domain.modulus
+        return PolyArray(coeffs, self.var, self.domain)
+
+    def __padded(self, other):
+        width = max(self.coeffs.shape[1], other.coeffs.shape[1])
+        a = numpy.zeros((len(self), width), dtype=self.coeffs.dtype)
+        a[:, :self.coeffs.shape[1]] = self.coeffs
+        b = numpy.zeros_like(a)
+        b[:, :other.coeffs.shape[1]] = other.coeffs
+        return a, b
+
+    def __add__(self, other):
+        self.__check(other)
+        a, b = self.__padded(other)
+        a += b
+        return self.__join(a)
+
+    def __sub__(self, other):
+        self.__check(other)
+        a, b = self.__padded(other)
+        a -= b
+        return self.__join(a)
+
+    def __neg__(self):
+        return self.__join(-self.coeffs)
+
+    def __mul__(self, other):
+        """Row by row products: for narrow rows each column of the
+        narrower operand scales the other and is added in at its shift,
+        for wide float rows the rows are convolved by FFT.
+        """
+        self.__check(other)
+        a, b = self.coeffs, other.coeffs
+        if a.shape[1] < b.shape[1]:
+            a, b = b, a
+        width = a.shape[1] + b.shape[1] - 1
+        modulus = self.domain.modulus
+        if not modulus and b.shape[1] >= FFT_WIDTH:
+            size = 1 << (width - 1).bit_length()
+            prod = (numpy.fft.rfft(a, size, axis=1) *
+                    numpy.fft.rfft(b, size, axis=1))
+            return self.__join(numpy.fft.irfft(prod, size, axis=1)[:, :width])
+        res = numpy.zeros((len(a), width), dtype=a.dtype)
+        for j in range(b.shape[1]):
+            step = a * b[:, j:j + 1]
+            if modulus:
+                step %= modulus
+            res[:, j:j + a.shape[1]] += step
+            if modulus:
+                res %= modulus
+        return self.__join(res)
+
+    def __divmod__(self, other):
+        """Row by row long division, every row eliminating its top column
+        at once. Each divisor row may have its own degree; zero divisor
+        rows raise ZeroDivisionError.
+        """
+        self.__check(other)
+        modulus = self.domain.modulus
+        b = other.coeffs
+        tops = _degrees(b)
+        if (tops < 0).any():
+            raise ZeroDivisionError("Division by the zero polynomial")
+        rows = numpy.arange(len(self))
+        lead = b[rows, tops]
+        if modulus:
+            lead = _inverse(lead, modulus)
+        span = numpy.arange(b.shape[1])
+        used = span <= tops[:, None]
+        width = self.coeffs.shape[1]
+        # Room past the top keeps the shifted divisor columns apart
+        rem = numpy.zeros((len(self), width + b.shape[1]),
+                          dtype=self.coeffs.dtype)
+        rem[:, :width] = self.coeffs
+        quot = numpy.zeros((len(self), width), dtype=rem.dtype)
+        for col in range(width - 1, -1, -1):
+            shift = col - tops
+            active = shift >= 0
+            if not active.any():
+                continue
+            if modulus:
+                factor = numpy.where(active, rem[:, col] * lead % modulus, 0)
+            else:
+                factor = numpy.where(active, rem[:, col] / lead, 0)
+            shift = numpy.where(active, shift, 0)
+            quot[rows, shift] = numpy.where(active, factor, quot[rows, shift])
+            cols = shift[:, None] + span
+            step = numpy.where(used, factor[:, None] * b, 0)
+            if modulus:
+                rem[rows[:, None], cols] = (rem[rows[:, None], cols] -
+                                            step % modulus) % modulus
+            else:
+                rem[rows[:, None], cols] -= step
+            rem[:, col] = numpy.where(active, 0, rem[:, col])
+        return self.__join(quot), self.__join(rem[:, :width])
+
+    def __truediv__(self, other):
+        return divmod(self, other)[0]
+
+    def __mod__(self, other):
+        return divmod(self, other)[1]
+
+    def plug(self, values):
+        """Every poly evaluated by Horner's scheme, all rows at once. values
+        is one value for every poly, a 1-D array with a value per poly, or
+        a 2-D array with a row of values per poly.
+        """
+        coeffs = self.coeffs
+        modulus = self.domain.modulus
+        values = numpy.asarray(values)
+        if modulus:
+            values = values % modulus
+        extra = (slice(None),) + (None,) * (values.ndim - 1)
+        res = numpy.zeros(numpy.broadcast_shapes(
+            (len(self),) + values.shape[1:], values.shape),
+            dtype=numpy.result_type(coeffs, values))
+        for j in range(coeffs.shape[1] - 1, -1, -1):
+            res = res * values + coeffs[:, j][extra]
+            if modulus:
+                res %= modulus
+        return res
@@ -7,12 +7,25 @@ from functools import total_ordering
 from functools import reduce
 from operator import add
 from copy import copy
-import string
+from fractions import Fraction
+from numbers import Integral
+import re
+import sys
+
+from dense import Dense
+from sparse import Sparse
+import binary
+import domains
+import evaluate
+import gcd
+import memo
+import render
+import roots
+import subproduct
 
 #----------------------LOW PRIORITY--------------------------
 #TODO: Plug in both Poly and Term need to accept **kwargs specifying in which
 #      variable the input is to be plugged. Still works for 'x' vars.
-#TODO: Implement exponentiation
 #TODO: Implement __radd__ type methods for Term and Poly
 #TODO: Fix BANDAGE issue. Just an ugly hack
 #----------------------HIGH PRIORITY-------------------------
@@ -25,69 +38,65 @@ class Term():
     Such a term would be instantiated by passing
     the integer coefficient, a string type Variable
     of one letter, and an integer exponent.
+    Integer and Fraction coefficients are kept exact,
+    anything else is stored as a float.
     """
 
+    __slots__ = ('coeff', 'var', 'expo', '_hash')
+
     def __init__(self, coeff=0.0, var='', expo=0):
+        """Terms are immutable once built. Variable names are interned, so
+        comparing them is usually a pointer check.
+        """
         if len(var) > 1:
             var = var[-1]
             print("Allows for single variables only, using '{}'".format(var))
 
-        self.coeff = float(coeff)
-        self.var = var.lower()
-        self.expo = expo
+        if not isinstance(coeff, (int, Fraction)) or isinstance(coeff, bool):
+            coeff = float(coeff)
+        var = sys.intern(var.lower())
 
         if coeff in (0, 0.0):
-            self.var = ''
-            self.expo = 0
+            var = ''
+            expo = 0
         elif expo == 0:
-            self.var = ''
+            var = ''
         elif var == '':
-            self.expo = 1
+            expo = 1
 
-    def __str__(self):
-        def coeff_format():
-            if self.coeff.is_integer():
-                return str(int(self.coeff))
-            else:
-                return "{:.3}".format(self.coeff)
-
-        # Coefficient string construction
-        if (coeff_format() == '-1') and self.var:
-            coefficient = '-'
-        elif self.coeff and (coeff_format() != '1'):
-            coefficient = coeff_format()
-        elif self.coeff and not self.var and (self.expo == 1):
-            coefficient = coeff_format()
-        else:
-            coefficient = ''
+        setattr_ = object.__setattr__
+        setattr_(self, 'coeff', coeff)
+        setattr_(self, 'var', var)
+        setattr_(self, 'expo', expo)
+        # Zero terms compare equal to 0, so they have to hash like it too
+        setattr_(self, '_hash', hash((coeff, var, expo)) if coeff else 0)
 
-        # Variable string construction
-        if self.var and (self.expo != 0):
-            variable = self.var
-        else:
-            variable = ''
+    def __setattr__(self, name, value):
+        raise AttributeError("Term objects are immutable")
 
-        # Exponent string construction
-        if self.expo and (self.expo != 0) and (self.expo != 1):
-            exponent = '^' + str(self.expo)
-        else:
-            exponent = ''
+    def __delattr__(self, name):
+        raise AttributeError("Term objects are immutable")
 
-        # Bring it on home.
-        if not coefficient and not variable and not exponent:
-            return '0'
-        else:
-            return coefficient + variable + exponent
+    def __hash__(self):
+        return self._hash
+
+    def __reduce__(self):
+        return Term, (self.coeff, self.var, self.expo)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __str__(self):
+        return render.PLAIN.term(self.var, self.expo, self.coeff,
+                                 True) if self.coeff else '0'
 
     def __lt__(self, other):
         if isinstance(other, Term):
-            if self.var == other.var:
-                if self.expo == other.expo:
-                    return self.coeff < other.coeff
-                else:
-                    return self.expo < other.expo
-            else:
-                return self.var < other.var
+            return ((self.var, self.expo, self.coeff) <
+                    (other.var, other.expo, other.coeff))
         elif other == 0:
             return self.coeff < 0
         elif isinstance(other, int):
@@ -97,7 +106,8 @@ class Term():
 
     def __eq__(self, other):
         if isinstance(other, Term):
-            return self.__dict__ == other.__dict__
+            return (self._hash == other._hash and self.coeff == other.coeff
+                    and self.var is other.var and self.expo == other.expo)
         elif other == 0:
             return self.coeff == 0
         elif isinstance(other, int):
@@ -131,6 +141,10 @@ class Term():
             elif other.var == self.var:
                 variable = self.var
                 exponent = self.expo + other.expo
+            elif self.var:
+                raise ValueError("Terms hold a single variable, use "
+                                 "multivariate.MPoly for {} * {}".format(
+                                     self, other))
             else:
                 variable = other.var
                 exponent = other.expo
@@ -168,6 +182,132 @@ class Term():
         return self.coeff * (value ** self.expo)
 
 
+#: Single variable polynomials with at least this many non-zero terms per
+#: exponent slot are stored in a dense coefficient array, the rest in
+#: sparse exponent and coefficient arrays.
+DENSE_RATIO = 0.25
+#: Below this degree single variable polynomials are always dense.
+DENSE_DEGREE = 16
+
+
+def _is_dense(degree, nonzero):
+    return degree < DENSE_DEGREE or nonzero >= DENSE_RATIO * (degree + 1)
+
+
+def _binomials(power, modulus):
+    """C(power, k) mod a prime for every k from 0 to power, from tables of
+    factorials and their inverses mod the prime. Powers of at least the
+    prime are taken digit by digit in base p, by Lucas' theorem.
+    """
+    size = min(power, modulus - 1) + 1
+    facts = [1] * size
+    for i in range(1, size):
+        facts[i] = facts[i - 1] * i % modulus
+    inverses = [1] * size
+    inverses[-1] = pow(facts[-1], -1, modulus)
+    for i in range(size - 1, 0, -1):
+        inverses[i - 1] = inverses[i] * i % modulus
+
+    def small(n, k):
+        if k > n:
+            return 0
+        return facts[n] * inverses[k] * inverses[n - k] % modulus
+
+    if power < modulus:
+        return [small(power, k) for k in range(power + 1)]
+    res = []
+    for k in range(power + 1):
+        n, rest, binom = power, k, 1
+        while binom and n:
+            binom = binom * small(n % modulus, rest % modulus) % modulus
+            n, rest = n // modulus, rest // modulus
+        res.append(binom)
+    return res
+
+
+def _univariate_items(terms):
+    """Returns (var, [(EXPONENT, COEFFICIENT)]) when every non-zero term
+    shares one variable and has a non-negative integer exponent, otherwise
+    None. Constant terms are given exponent 0.
+    """
+    var = ''
+    items = []
+    for term in terms:
+        if not term.coeff:
+            continue
+        if not term.var:
+            items.append((0, term.coeff))
+        elif ((var and term.var != var) or not isinstance(term.expo, int)
+              or term.expo < 0):
+            return None
+        else:
+            var = term.var
+            items.append((term.expo, term.coeff))
+    return var, items
+
+
+def _from_items(items, var, domain):
+    """Dense or sparse array, whichever suits, for (exponent, coefficient)
+    pairs with non-zero coefficients.
+    """
+    degree = max((expo for expo, coeff in items), default=0)
+    if _is_dense(degree, len(items)):
+        return Dense.from_items(items, var, domain)
+    return Sparse.from_items(items, var, domain)
+
+
+def _pick_rep(terms, domain):
+    """Dense or sparse array for the terms in the given coefficient
+    domain, or None if they have to be left as Terms.
+    """
+    found = _univariate_items(terms)
+    if found is None:
+        return None
+    var, items = found
+    return _from_items(items, var, domain)
+
+
+def _settle(rep):
+    """Move an array backend over to the other one if its density no
+    longer suits it.
+    """
+    dense = _is_dense(rep.degree, rep.nonzero())
+    if dense and isinstance(rep, Sparse):
+        return Dense.from_items(rep.items(), rep.var, rep.domain)
+    elif not dense and isinstance(rep, Dense):
+        return Sparse.from_items(rep.items(), rep.var, rep.domain)
+    return rep
+
+
+def _convert(rep, kind, domain):
+    """Array backend as the given backend class, in the domain. Only a
+    change of class goes through (exponent, coefficient) pairs.
+    """
+    if type(rep) is kind:
+        return rep.to_domain(domain)
+    return kind.from_items(rep.items(), rep.var, domain)
+
+
+def _constant(value):
+    """Constant poly holding an int in its own smallest domain"""
+    return Poly(Term(value), domain=domains.of(value))
+
+
+def _pack_result(res):
+    """Records of an operation's poly or polys, None if any is held as
+    Terms.
+    """
+    polys = res if isinstance(res, tuple) else (res,)
+    if any(poly._rep is None for poly in polys):
+        return None
+    return tuple(poly._record() for poly in polys)
+
+
+def _unpack_result(records):
+    polys = tuple(map(Poly.from_bytes, records))
+    return polys if len(polys) > 1 else polys[0]
+
+
 @total_ordering
 class Poly():
     """Poly objects represent polynomials.
@@ -177,75 +317,294 @@ class Poly():
     passed as arguments will be ignored.
     """
 
-    def __init__(self, *args):
-        """Store terms in a top-level dict keyed by var, in a lower-level
-        dict keyed by the term's exponents: {VAR : {EXPONENT : [TERM OBJECTS]}}
+    #: Operation cache shared by every poly, see cache_operations
+    _ops = None
+
+    def __init__(self, *args, domain=None):
+        """Single variable polynomials are stored in coefficient arrays,
+        see dense.Dense and sparse.Sparse, with coefficients of the given
+        domain: float by default, or 'int' or 'rational' for exact
+        arithmetic (see domains.get_domain). Otherwise store terms in a
+        top-level dict keyed by var, in a lower-level dict keyed by the
+        term's exponents: {VAR : {EXPONENT : [TERM OBJECTS]}}
         """
 
-        self.terms = dict()
+        args = [term for term in args if isinstance(term, Term)]
+        self._cache = {}
+        self._rep = _pick_rep(args, domains.get_domain(domain))
+        if self._rep is not None:
+            self._terms = None
+            return
+
+        self._terms = dict()
         for term in args:
-            if isinstance(term, Term):
-                self.terms.setdefault(term.var, {}).setdefault(
-                                      term.expo, []).append(term)
+            if not term.var and term.expo:
+                term = Term(term.coeff)  # Constants all live at exponent 0
+            self._terms.setdefault(term.var, {}).setdefault(
+                                   term.expo, []).append(term)
         self.__simplify()
 
+    @classmethod
+    def _from_rep(cls, rep, settled=False):
+        """Wrap an array backend without going through Term objects. Unless
+        settled, it is first moved to the backend its density suits.
+        """
+        poly = cls.__new__(cls)
+        poly._rep = rep if settled else _settle(rep)
+        poly._terms = None
+        poly._cache = {}
+        return poly
+
+    def _invalidate(self):
+        """Drop everything cached about the poly; call after mutating it.
+        A fresh dict is bound rather than the old one cleared, since
+        copies share it until they change.
+        """
+        self._cache = {}
+
+    @property
+    def terms(self):
+        """{VAR : {EXPONENT : TERM}}, built on demand for array backends"""
+        if self._terms is None:
+            self._terms = dict()
+            for term in self:
+                self._terms.setdefault(term.var, {})[term.expo] = term
+        return self._terms
+
+    def _pair(self, other):
+        """Both array backends, converted to a common backend and domain,
+        or None if either poly is held as Terms or their variables differ.
+        """
+        mine, theirs = self._rep, other._rep
+        if mine is None or theirs is None or not mine.compatible(theirs):
+            return None
+        domain = domains.unify(mine.domain, theirs.domain)
+        kind = type(mine) if type(mine) is type(theirs) else Sparse
+        return _convert(mine, kind, domain), _convert(theirs, kind, domain)
+
+    @property
+    def domain(self):
+        """Coefficient domain; polys held as Terms are always float"""
+        return self._rep.domain if self._rep is not None else domains.FLOAT
+
+    def to_domain(self, domain):
+        """The same poly with its coefficients converted to the domain"""
+        if self._rep is None:
+            return Poly(*self)
+        domain = domains.get_domain(domain)
+        if domain is self._rep.domain:
+            return copy(self)
+        return Poly._from_rep(self._rep.to_domain(domain))
+
     def __str__(self):
-        rep = []
-        for term in self:
-            if not term.coeff and not term.var:
-                pass
-            elif term < 0 and rep:  # Get rid of unnecessary signs unless first
-                rep.append('-')
-                rep.append(str(term)[1:])
-            elif term < 0:
-                rep.append(str(term))
-            else:
-                rep.append('+')
-                rep.append(str(term))
-        if rep and rep[0] == '+':
-            rep.pop(0)
-        if not rep:
-            return '0'
-        return ' '.join(rep)
+        return render.text(self._triples())
+
+    def _triples(self):
+        """(variable, exponent, coefficient) for every term, highest
+        exponent first, without building Terms for array backends.
+        """
+        if self._rep is not None:
+            var = self._rep.var
+            return ((var, expo, coeff) for expo, coeff in self._rep.items())
+        return ((term.var, term.expo, term.coeff) for term in self)
+
+    def format(self, style='plain'):
+        """Text of the poly in a style of render.py: 'plain' as str gives,
+        'latex' for math mode, or 'machine' for JSON.
+        """
+        return render.text(self._triples(), style)
+
+    def write(self, file, style='plain'):
+        """Stream the poly's text to a file a term at a time, never holding
+        all of it.
+        """
+        render.write(self._triples(), file.write, style)
 
     def __lt__(self, other):
         if isinstance(other, Poly):
             return self.degree < other.degree
         elif isinstance(other, Term):
-            return list(self)[0] < other
+            return self[0] < other
         elif other == 0:
-            return list(self)[0] < 0
+            return self[0] < 0
         else:
             raise TypeError("These types cannot be compared")
 
     def __eq__(self, other):
         if isinstance(other, Poly):
-            return list(self) == list(other)
+            # GF(p) polys only equal polys over the same field, so that
+            # equal polys always hash alike
+            if self.domain.modulus != other.domain.modulus:
+                return False
+            pair = self._pair(other)
+            if pair:
+                return pair[0] == pair[1]
+            return tuple(self) == tuple(other)
         else:
             raise TypeError("These types cannot be compared")
 
+    def __hash__(self):
+        """Hash of the modulus, if any, and the canonical set of terms, so
+        that equal polys hash alike whatever their backend or domain.
+        Polys used as keys must not be changed in place.
+        """
+        if 'hash' not in self._cache:
+            self._cache['hash'] = hash((self.domain.modulus, frozenset(
+                (var if expo else '', expo, coeff)
+                for var, expo, coeff in self._triples() if coeff)))
+        return self._cache['hash']
+
+    @classmethod
+    def cache_operations(cls, maxsize=memo.MAXSIZE, maxbytes=memo.MAXBYTES):
+        """Keep the results of *, /, % and divmod between single variable
+        polys in a least recently used cache of at most maxsize entries
+        and maxbytes of binary records; see memo.py. Returns the cache,
+        whose stats() counts hits and misses. maxsize=0 turns it off.
+        """
+        cls._ops = memo.OpCache(maxsize, maxbytes) if maxsize else None
+        return cls._ops
+
+    def _record(self):
+        """Binary record of the poly, kept until it is changed"""
+        if 'record' not in self._cache:
+            self._cache['record'] = binary.pack(self._rep)
+        return self._cache['record']
+
+    def __cached(self, op, other, compute):
+        """compute(), looked up in the operation cache when it is on and
+        both polys are held in arrays.
+        """
+        cache = Poly._ops
+        if (cache is None or not isinstance(other, Poly) or
+                self._rep is None or other._rep is None):
+            return compute()
+        return cache.lookup((op, self._record(), other._record()), compute,
+                            _pack_result, _unpack_result)
+
+    def __copy__(self):
+        """Copies get their own term storage, so that in-place operators
+        on one never show through the other.
+        """
+        poly = Poly.__new__(Poly)
+        if self._rep is not None:
+            poly._rep, poly._terms = copy(self._rep), None
+        else:
+            poly._rep = None
+            poly._terms = {var: dict(expos)
+                           for var, expos in self._terms.items()}
+        poly._cache = self._cache
+        return poly
+
     def __add__(self, other):
+        if isinstance(other, int):
+            other = _constant(other)
         if isinstance(other, Poly):
-            res = []
-            for term in self:
-                res.append(term)
-            for term in other:
-                res.append(term)
-            return Poly(*res)
-        elif isinstance(other, int):
-            return Poly(*(list(self) + [other]))
+            pair = self._pair(other)
+            if pair:
+                return Poly._from_rep(pair[0] + pair[1])
+            return copy(self).__merge(other, 1)
         else:
             raise ValueError("Incompatible Types")
 
     def __sub__(self, other):
+        if isinstance(other, int):
+            other = _constant(other)
         if isinstance(other, Poly):
-            for term in other:
-                term.coeff *= -1
-            return self + other
-        elif isinstance(other, int):
-            return Poly(*(list(self) - [other]))
+            pair = self._pair(other)
+            if pair:
+                return Poly._from_rep(pair[0] - pair[1])
+            return copy(self).__merge(other, -1)
+        else:
+            raise ValueError("Incompatible Types")
+
+    def __iadd__(self, other):
+        if isinstance(other, int):
+            other = _constant(other)
+        if isinstance(other, Poly):
+            return self.__merge(other, 1)
+        raise ValueError("Incompatible Types")
+
+    def __isub__(self, other):
+        if isinstance(other, int):
+            other = _constant(other)
+        if isinstance(other, Poly):
+            return self.__merge(other, -1)
+        raise ValueError("Incompatible Types")
+
+    def __imul__(self, other):
+        # A product rarely fits in its multiplicand's storage, so build it
+        # and take its storage over.
+        res = self * other
+        self._rep, self._terms = res._rep, res._terms
+        self._invalidate()
+        return self
+
+    def __merge(self, other, sign):
+        """Add sign * other into this poly in place. Array backends are
+        updated where they sit, with other brought over to this poly's
+        backend and domain, unless its domain is the wider one; Terms are
+        merged into the term dict one at a time. other is never modified.
+        """
+        mine, theirs = self._rep, other._rep
+        arrays = (mine is not None and theirs is not None and
+                  mine.compatible(theirs))
+        if arrays and domains.unify(mine.domain, theirs.domain) is mine.domain:
+            # Only the addend is brought over to this poly's backend
+            addend = _convert(theirs, type(mine), mine.domain)
+            degree = mine.degree
+            if sign > 0:
+                mine += addend
+            else:
+                mine -= addend
+            self._rep = mine if mine.degree == degree else _settle(mine)
+            self._terms = None
+        elif arrays:
+            # A wider domain needs new storage anyway
+            pair = self._pair(other)
+            self._rep = _settle(pair[0] + pair[1] if sign > 0 else
+                                pair[0] - pair[1])
+            self._terms = None
+        else:
+            terms = self.terms
+            self._rep = None
+            if other._rep is not None:
+                addends = iter(other)
+            else:
+                addends = (term for expos in other.terms.values()
+                           for term in expos.values())
+            for term in addends:
+                expos = terms.setdefault(term.var, {})
+                old = expos.get(term.expo)
+                if old is None or not old.coeff:
+                    new = term if sign > 0 else term * -1
+                else:
+                    new = old + term if sign > 0 else old - term
+                if new.coeff:
+                    expos[term.expo] = new
+                else:
+                    expos.pop(term.expo, None)
+                    if not expos:
+                        del terms[term.var]
+        self._invalidate()
+        return self
 
     def __mul__(self, other):
+        return self.__cached('*', other, lambda: self.__times(other))
+
+    def __times(self, other):
+        if self._rep is not None:
+            if isinstance(other, str) and other == self._rep.var:
+                other = Term(1, other, 1)
+            if isinstance(other, Term):
+                other = Poly(other)
+            if isinstance(other, (int, float, Fraction)):
+                domain = domains.unify(self.domain, domains.of(other))
+                return Poly._from_rep(self._rep.to_domain(domain).scale(
+                                      domain.convert(other)))
+            pair = self._pair(other) if isinstance(other, Poly) else None
+            if pair:
+                return Poly._from_rep(pair[0] * pair[1])
+
         res = []
         if isinstance(other, Poly):
             for multiplicand in self:
@@ -257,9 +616,16 @@ class Poly():
         return Poly(*res)
 
     def __divmod__(self, other):
+        return self.__cached('divmod', other, lambda: self.__divide(other))
+
+    def __divide(self, other):
         def factor(dividend, divisor):  # Self == dividend, other == divisor
             return dividend[0] / divisor[0]
-        if isinstance(other, Poly):
+        pair = self._pair(other) if isinstance(other, Poly) else None
+        if pair:
+            quot, remain = divmod(*pair)
+            return Poly._from_rep(quot), Poly._from_rep(remain)
+        elif isinstance(other, Poly):
             remain = copy(self)
             res = []
             while (other <= remain) and (factor(remain, other) != 0):
@@ -275,32 +641,412 @@ class Poly():
         res, remain = self.__divmod__(other)
         return remain
 
+    def __pow__(self, power, modulus=None):
+        """Binary exponentiation: O(log power) products, each going through
+        the fastest multiply the backend has. Binomials with exact
+        coefficients are expanded by the binomial theorem instead. Given a
+        modulus poly, as in pow(p, n, m), every product is reduced by it.
+        """
+        if not isinstance(power, int) or power < 0:
+            raise ValueError("Powers must be non-negative integers")
+        if (modulus is None and self._rep is not None and
+                self.domain.exact and self._rep.nonzero() == 2):
+            return self.__binomial(power)
+
+        res = self._unit()
+        base = self if modulus is None else self % modulus
+        while power:
+            if power & 1:
+                res = res * base
+                if modulus is not None:
+                    res = res % modulus
+            power >>= 1
+            if power:
+                base = base * base
+                if modulus is not None:
+                    base = base % modulus
+        return res if modulus is None else res % modulus
+
+    def _unit(self):
+        """The constant 1 in the poly's domain"""
+        if self._rep is None:
+            return Poly(Term(1))
+        domain = self._rep.domain
+        return Poly._from_rep(Dense([domain.one], '', domain))
+
+    def __binomial(self, power):
+        """(a x^i + b x^j)^n expanded term by term as
+        C(n, k) a^k b^(n-k) x^(ik + j(n-k)). The powers of a are carried
+        from one term to the next and the powers of b worked out once. The
+        binomial is carried exactly too, except over GF(p), where every
+        C(n, k) mod p comes from _binomials.
+        """
+        rep = self._rep
+        domain = rep.domain
+        modulus = domain.modulus
+        (high, a), (low, b) = rep.items()
+
+        def reduce_(num):
+            return num % modulus if modulus else num
+
+        lows = [domain.one]
+        for _ in range(power):
+            lows.append(reduce_(lows[-1] * b))
+        binoms = _binomials(power, modulus) if modulus else None
+        items = []
+        binom, highs = 1, domain.one
+        for k in range(power + 1):
+            if modulus:
+                binom = binoms[k]
+            if binom:
+                items.append((high * k + low * (power - k),
+                              reduce_(binom * highs * lows[power - k])))
+            if not modulus:
+                binom = binom * (power - k) // (k + 1)
+            highs = reduce_(highs * a)
+        degree = high * power
+        if _is_dense(degree, len(items)):
+            res = Dense.from_items(items, rep.var, domain)
+        else:
+            res = Sparse.from_items(items, rep.var, domain)
+        return Poly._from_rep(res)
+
+    def diff(self, var=None):
+        """Derivative. Polys held as Terms in several variables need the
+        variable named; terms in the others are constants.
+        """
+        if self._rep is not None:
+            if var is not None and var != self._rep.var:
+                return Poly._from_rep(Dense(domain=self.domain))
+            return Poly._from_rep(self._rep.diff())
+        var = self.__variable(var)
+        return Poly(*(Term(term.coeff * term.expo, var, term.expo - 1)
+                      for term in self if term.var == var))
+
+    def integrate(self, constant=0):
+        """Antiderivative with the given constant term. Int polys are
+        integrated as rationals.
+        """
+        domain = self.domain
+        if domain is domains.INTEGER:
+            domain = domains.RATIONAL
+        if self._rep is not None:
+            return Poly._from_rep(self._rep.to_domain(domain).integrate(
+                                  domain.convert(constant)))
+        var = self.__variable(None)
+        if any(term.var and term.expo == -1 for term in self):
+            raise ValueError("x^-1 has no polynomial antiderivative")
+        return Poly(Term(constant), *(Term(term.coeff / (term.expo + 1), var,
+                                           term.expo + 1) if term.var else
+                                      Term(term.coeff, var, 1)
+                                      for term in self))
+
+    def __variable(self, var):
+        """The variable of a poly held as Terms, checked against var"""
+        found = {term.var for term in self if term.var}
+        if var is None and len(found) > 1:
+            raise ValueError("Name the variable, the poly has several")
+        return var or (found.pop() if found else 'x')
+
+    def compose(self, other):
+        """self(other(x)), by divide and conquer over the repeated squares
+        of other; see evaluate.compose.
+        """
+        if isinstance(other, (int, float, Fraction)):
+            other = Poly(Term(other), domain=domains.of(other))
+        if (not isinstance(other, Poly) or self._rep is None or
+                other._rep is None):
+            raise ValueError("Only single variable polynomials can be "
+                             "composed")
+        domain = domains.unify(self.domain, other.domain)
+        outer, inner = (Dense.from_items(rep.items(), rep.var, domain)
+                        if isinstance(rep, Sparse) else rep.to_domain(domain)
+                        for rep in (self._rep, other._rep))
+        return Poly._from_rep(outer.compose(inner))
+
     def __iter__(self):
-        rep = []
-        for var in self.terms.values():
-            for term in var.values():
-                rep.append(term)
-        return iter(sorted(rep, reverse=True))
+        """Terms, highest first, made one at a time from the arrays or
+        walked straight off the kept canonical order.
+        """
+        if self._rep is not None:
+            var = self._rep.var
+            return (Term(coeff, var, expo)
+                    for expo, coeff in self._rep.items())
+        return iter(self._order())
+
+    def _order(self):
+        """Terms of a poly held as Terms in canonical order, highest first,
+        sorted once and kept until the poly is changed.
+        """
+        order = self._cache.get('order')
+        if order is None:
+            order = tuple(sorted((term for expos in self.terms.values()
+                                  for term in expos.values()), reverse=True))
+            self._cache['order'] = order
+        return order
 
     def __getitem__(self, index):
+        if self._rep is None:
+            return self._order()[index]
+        if isinstance(index, int):
+            expo, coeff = self._rep.item(index)
+            return Term(coeff, self._rep.var, expo)
         return list(self)[index]
 
+    def __len__(self):
+        """Number of terms, zero for the zero poly"""
+        if self._rep is not None:
+            if 'len' not in self._cache:
+                self._cache['len'] = self._rep.nonzero()
+            return self._cache['len']
+        return len(self._order())
+
     def __simplify(self):
-        for var in self.terms:
-            for expo in self.terms[var]:
-                self.terms[var][expo] = reduce(add, self.terms[var][expo])
+        """Sum the Terms at each exponent, dropping those that cancel so
+        that len and the canonical order only ever see non-zero terms.
+        """
+        for var in list(self._terms):
+            expos = self._terms[var]
+            for expo in list(expos):
+                term = reduce(add, expos[expo])
+                if term.coeff:
+                    expos[expo] = term
+                else:
+                    del expos[expo]
+            if not expos:
+                del self._terms[var]
+
+    @property
+    def leading_term(self):
+        """Highest term, or a zero Term for the zero poly"""
+        if self._rep is not None:
+            if not len(self._rep):
+                return Term(0)
+            expo, coeff = self._rep.leading()
+            return Term(coeff, self._rep.var, expo)
+        order = self._order()
+        return order[0] if order else Term(0)
 
     @property
     def degree(self):
-        deg = list(self)[0]
-        if deg.var:
-            return deg.expo
-        else:
-            return 0
+        if self._rep is not None:
+            return self._rep.degree
+        order = self._order()
+        return order[0].expo if order and order[0].var else 0
 
     def plug(self, value):
         """Evaluate polynomial for x in f(x)"""
-        return reduce(add, (x.plug(value) for x in self._linearize()))
+        if self._rep is not None:
+            return self._rep.plug(value)
+        return sum(term.plug(value) for term in self)
+
+    def plug_many(self, values):
+        """Evaluate polynomial for every x in values in one pass. A numpy
+        array of values gives a numpy array back: floats for float polys,
+        exact Python numbers in an object array for the exact domains.
+        Anything else gives a list.
+        """
+        if self._rep is not None:
+            return self._rep.plug_many(values)
+        return [self.plug(value) for value in values]
+
+    def evaluate_many(self, points):
+        """Evaluate polynomial at every point. Over GF(p) the poly is
+        remaindered down a subproduct tree of the points, quasi-linear in
+        their number; see subproduct.py. Over other domains the tree's
+        remainders carry huge or inexact coefficients, and Horner's scheme
+        is used, as in plug_many. Over GF(p) the values come back as a
+        list whichever way they are found.
+        """
+        if self._rep is None or not self.domain.modulus:
+            return self.plug_many(points)
+        # numpy ints are taken as the Python ints they hold
+        points = [int(point) if isinstance(point, Integral) else point
+                  for point in points]
+        if len(points) < subproduct.TREE_CUTOFF:
+            return self.plug_many(points)
+        var, domain, (coeffs,) = self._coeffs()
+        return subproduct.evaluate(coeffs, points, domain)
+
+    @classmethod
+    def interpolate(cls, xs, ys, var='x', domain=None):
+        """The poly of least degree through every (x, y) pair, built up a
+        subproduct tree; see subproduct.py. The domain defaults to the
+        smallest holding every value, with int values interpolated as
+        rationals. Float interpolation is only as good as the monomial
+        basis allows, which degrades quickly beyond a few dozen points.
+        """
+        if domain is None:
+            domain = reduce(domains.unify,
+                            map(domains.of, list(xs) + list(ys)),
+                            domains.INTEGER)
+            if domain is domains.INTEGER:
+                domain = domains.RATIONAL
+        domain = domains.get_domain(domain)
+        if domain is domains.INTEGER:
+            raise ValueError("Interpolation needs a field, not int")
+        coeffs = subproduct.interpolate(list(xs), list(ys), domain)
+        return cls._from_rep(Dense(coeffs, var, domain))
+
+    def roots(self, method='aberth', polish=True):
+        """Every complex root, repeated by multiplicity, found numerically
+        by Aberth-Ehrlich iteration or, with method='companion', as the
+        eigenvalues of the companion matrix; see roots.py. Newton steps
+        polish them unless polish is False.
+        """
+        if self.domain.modulus:
+            raise ValueError("Roots are found numerically, not in {}"
+                             .format(self.domain))
+        var, domain, (coeffs,) = self._coeffs()
+        return roots.find(coeffs, method, polish)
+
+    @staticmethod
+    def roots_many(polys, method='aberth', polish=True):
+        """Roots of many polys of one degree, solved together as whole
+        array operations. Returns a numpy array with a row per poly.
+        """
+        polys = list(polys)
+        degrees = {poly.degree for poly in polys}
+        if len(degrees) > 1:
+            raise ValueError("Polys solved together must share a degree")
+        size = degrees.pop() + 1 if degrees else 1
+        rows = []
+        for poly in polys:
+            var, domain, (coeffs,) = poly._coeffs()
+            rows.append([complex(coeff) for coeff in coeffs] +
+                        [0j] * (size - len(coeffs)))
+        return roots.batch(rows, method, polish)
+
+    def compile(self):
+        """Generate a function f(x) with the coefficients baked into Horner
+        form, which skips the dispatch plug goes through on every call. It
+        works for single values and, element by element, numpy arrays,
+        which exact domains evaluate as object arrays of Python numbers.
+        The function is cached until the poly is mutated.
+        """
+        if 'compiled' not in self._cache:
+            if self._rep is not None:
+                func = self._rep.compile()
+            else:
+                powers = Sparse.from_items((term.expo, term.coeff)
+                                           for term in self)
+                func = evaluate.compile_sparse(powers.expos, powers.coeffs)
+            self._cache['compiled'] = func
+        return self._cache['compiled']
+
+    def _coeffs(self, other=None):
+        """(var, domain, coefficient lists) of this poly, and other if
+        given, as dense arrays in a common domain.
+        """
+        if other is None:
+            pair = (self._rep,) if self._rep is not None else None
+        else:
+            pair = self._pair(other) if isinstance(other, Poly) else None
+        if not pair:
+            raise ValueError("Only single variable polynomials are "
+                             "supported")
+        var = ''.join(rep.var for rep in pair)[:1]
+        domain = pair[0].domain
+        return var, domain, [list(rep.coeffs) if isinstance(rep, Dense) else
+                             list(Dense.from_items(rep.items(), rep.var,
+                                                   domain).coeffs)
+                             for rep in pair]
+
+    def to_bytes(self):
+        """Compact binary record of the poly's coefficients, see binary.py"""
+        if self._rep is None:
+            raise ValueError("Only single variable polynomials have a "
+                             "binary form")
+        return binary.pack(self._rep)
+
+    @classmethod
+    def from_bytes(cls, buffer, offset=0):
+        """Poly from the binary record at offset of any bytes-like buffer"""
+        return cls._from_rep(binary.unpack(buffer, offset)[0])
+
+    def gcd(self, other):
+        """Greatest common divisor, worked out exactly whatever the domain:
+        primitive with a positive leading coefficient for int polys, monic
+        for every other domain. See gcd.py.
+        """
+        var, domain, (a, b) = self._coeffs(other)
+        return Poly._from_rep(Dense(gcd.gcd(a, b, domain), var, domain))
+
+    def lcm(self, other):
+        """Least common multiple, normalized the way gcd is"""
+        var, domain, (a, b) = self._coeffs(other)
+        return Poly._from_rep(Dense(gcd.lcm(a, b, domain), var, domain))
+
+    def extended_gcd(self, other):
+        """(g, s, t) with s * self + t * other == g, the monic gcd. Int
+        polys get rational results, since their cofactors seldom have
+        integer coefficients.
+        """
+        var, domain, (a, b) = self._coeffs(other)
+        out = domains.RATIONAL if domain is domains.INTEGER else domain
+        return tuple(Poly._from_rep(Dense(coeffs, var, out))
+                     for coeffs in gcd.extended_gcd(a, b, domain))
+
+    def squarefree(self):
+        """(constant, [(factor, multiplicity), ...]) with the poly equal to
+        the constant times each factor raised to its multiplicity. The
+        factors are square-free and coprime, normalized the way gcd is.
+        """
+        var, domain, (coeffs,) = self._coeffs()
+        const, parts = gcd.squarefree(coeffs, domain)
+        return const, [(Poly._from_rep(Dense(factor, var, domain)), mult)
+                       for factor, mult in parts]
+
+
+#: One term of a polynomial: an optional sign, then a coefficient, a
+#: variable, or both. The exponent follows the variable as 4x^3 or 4x3,
+#: and may only carry a sign after ^, so that 3x^2-2x+1 reads as three
+#: terms. Whitespace is allowed around the sign.
+_TERM = re.compile(r"""
+    (?P<space>\s*)
+    (?P<sign>[+-]?)\s*
+    (?P<coeff>\d+\.?\d*|\.\d+)?
+    (?:(?P<var>[a-zA-Z]+)(?:\^(?P<expo>[+-]?\d+)|(?P<bare>\d+))?)?
+""", re.VERBOSE)
+
+
+def _fail(inpt, pos):
+    """SyntaxError pointing at the offending character"""
+    found = repr(inpt[pos]) if pos < len(inpt) else 'end of input'
+    err = SyntaxError("Improper input formatting ({}) at position {}"
+                      .format(found, pos))
+    err.text, err.offset = inpt, pos + 1
+    raise err
+
+
+def _scan(inpt):
+    """(coefficient, variable, exponent) for every term of the input, in
+    one pass of a precompiled regex. Coefficients written without a point
+    are ints. Terms must be joined by a sign, or at least whitespace, which
+    adds them as the old space-separated format did.
+    """
+    pos, end = 0, len(inpt.rstrip())
+    while pos < end:
+        found = _TERM.match(inpt, pos)
+        space, sign, coeff, var = found.group('space', 'sign', 'coeff', 'var')
+        if not (coeff or var):
+            _fail(inpt, found.end())
+        if pos and not (sign or space):
+            _fail(inpt, pos)
+        if not coeff:
+            coeff = 1
+        elif '.' in coeff:
+            coeff = float(coeff)
+        else:
+            coeff = int(coeff)
+        if var:
+            var = var.lower()
+            expo = found.group('expo') or found.group('bare')
+            expo = int(expo) if expo else 1
+        else:
+            var, expo = '', 0
+        yield (-coeff if sign == '-' else coeff), var, expo
+        pos = found.end()
 
 
 def parse_term(inpt):
@@ -308,69 +1054,77 @@ def parse_term(inpt):
     Allows for both 4x^3 or 4x3, which will build equivilant
     Term objects.
     """
+    terms = list(_scan(inpt))
+    if len(terms) != 1:
+        raise SyntaxError("Expected a single term ({})".format(inpt))
+    return Term(*terms[0])
 
-    def fix(num, cls=int):
-        if num == '-':
-            return -1
-        elif num:
-            try:
-                return cls(num)
-            except ValueError:
-                raise SyntaxError("Improper input formatting ({})".format(num))
-        else:
-            return 1
 
-    inpt = inpt.replace('^', '')
-    coeff = ''
-    var = ''
-    expo = ''
-
-    for item in inpt:
-        if item.isdigit() and var:
-            expo += item
-        elif item.isdigit():
-            coeff += item
-        elif item.isalpha():
-            var += item
-        elif item in ('-', '+'):
-            if var and item not in expo:
-                expo = item + expo
-            elif item not in coeff:
-                coeff = item + coeff
-            else:
-                pass
-        elif item == '.' and var:
-            expo += item
-        elif item == '.':
-            coeff += item
+def _parse_rep(inpt, domain):
+    """Dense or sparse array for a single variable polynomial, built in
+    the same pass of the regex that checks the input, or None if it has
+    to be held as Terms. The array suits the density of the terms as
+    written. See _scan for the format.
+    """
+    match = _TERM.match
+    pos, end = 0, len(inpt.rstrip())
+    name = ''
+    expos, coeffs = [], []
+    while pos < end:
+        found = match(inpt, pos)
+        space, sign, coeff, var, expo, bare = found.groups()
+        if not (coeff or var):
+            _fail(inpt, found.end())
+        if pos and not (sign or space):
+            _fail(inpt, pos)
+        pos = found.end()
+        if not coeff:
+            coeff = 1
+        elif '.' in coeff:
+            coeff = float(coeff)
         else:
-            raise SyntaxError("Improper input formatting ({}).".format(item))
-
-    coeff = fix(coeff, float)
-    expo = fix(expo, int)
+            coeff = int(coeff)
+        if var:
+            var = var.lower()
+            if var != name:
+                if name or len(var) > 1:
+                    return None
+                name = var
+            expo = int(expo or bare or 1)
+            if expo < 0:
+                return None
+        else:
+            expo = 0
+        if coeff:
+            expos.append(expo)
+            coeffs.append(-coeff if sign == '-' else coeff)
 
-    return Term(coeff, var, expo)
+    degree = max(expos, default=0)
+    if not _is_dense(degree, len(expos)):
+        return Sparse.from_items(zip(expos, coeffs), name, domain)
+    convert = domain.convert
+    dense = domain.storage([domain.zero]) * (degree + 1)
+    for expo, coeff in zip(expos, coeffs):
+        dense[expo] += convert(coeff)
+    return Dense(domain.reduce(dense), name, domain)
 
 
-def parse_poly(inpt):
+def parse_poly(inpt, domain=None):
     """Parses input to create a Poly
-    operators and terms should be separated by spaces:
-    5x^3 - 3x^2 + x + 9
+    Operators need no spaces around them: 5x^3 - 3x^2 + x + 9 and
+    5x^3-3x^2+x+9 are the same. Single variable polynomials go straight
+    into coefficient arrays of the given domain without building Terms.
+    Errors are raised as SyntaxError with the offending position.
     """
+    domain = domains.get_domain(domain)
+    rep = _parse_rep(inpt, domain)
+    if rep is None:
+        return Poly(*(Term(*term) for term in _scan(inpt)), domain=domain)
+    return Poly._from_rep(rep, settled=True)
 
-    terms = []
-    sign = 1
-    for item in inpt.split():
-        if item in string.whitespace or item == '+':
-            pass
-        elif item == '-':
-            sign = -1
-        else:
-            terms.append(parse_term(''.join(item)) * sign)
-            sign = 1
-    return Poly(*terms)
 
 if __name__ == '__main__':
+    Poly.cache_operations()
     stack = []
     select = {
                 '?' : 'print(",\t".join((str(x) for x in stack)))',
@@ -382,7 +1136,8 @@ if __name__ == '__main__':
     def hlp():
         print("""\n\t\t\t\t\tThe Polynator
               Allows for calculator of single variable polynomials using a
-              variety of operations (+, -, *, /, %) in reverse polish notation.
+              variety of operations (+, -, *, /, %, ^) in reverse polish
+              notation.
               As polynomials are entered, they are placed on a stack, and
               mathematical operations make use of the newest two.
 
@@ -405,8 +1160,22 @@ if __name__ == '__main__':
             if inpt in select:
                 eval(select[inpt])
             elif inpt in ('-', '+', '*', '/', '%'):
-                stack.append(eval('stack.pop(-2) {} stack.pop()'.format(inpt)))
+                # Operands are only taken off once the result is in hand
+                res = eval('stack[-2] {} stack[-1]'.format(inpt))
+                del stack[-2:]
+                stack.append(res)
                 print(stack[-1])
+            elif inpt == '^':
+                if len(stack) < 2:
+                    raise IndexError("Not enough items on the stack")
+                power = stack[-1].plug(0)
+                if stack[-1].degree or power < 0 or power != int(power):
+                    print("Powers must be non-negative integers.")
+                else:
+                    res = stack[-2] ** int(power)
+                    del stack[-2:]
+                    stack.append(res)
+                    print(stack[-1])
             elif inpt == 'clear':
                 for item in stack:
                     stack.remove(item)
@@ -417,11 +1186,13 @@ if __name__ == '__main__':
             else:
                 try:
                     stack.append(parse_poly(inpt))
-                except SyntaxError:
-                    print("'{}' not valid input\n".format(inpt))
+                except SyntaxError as err:
+                    print("'{}' not valid input: {}\n".format(inpt, err))
                     hlp()
         except IndexError:
             print("Not enough items on the stack.")
+        except ValueError as err:
+            print(err)
 
         return inpt
 
@@ -0,0 +1,117 @@
+"""
+Author: Ryan Roler (ryan.roler@gmail.com)
+Text output for polynomials. Terms come in as (variable, exponent,
+coefficient) triples, highest exponent first, and each is rendered once,
+by a style, straight into whatever write function is given: a list's
+append to build one string, or a file's write to stream a polynomial of
+any size without holding its text.
+"""
+
+from fractions import Fraction
+import json
+
+
+class PlainStyle():
+    """3x^2 - 2x + 1, the way Poly.__str__ has always written polys"""
+
+    opening = closing = ''
+    empty = '0'
+
+    def number(self, coeff):
+        """Text of a non-negative coefficient"""
+        if isinstance(coeff, float) and not coeff.is_integer():
+            return "{:.3}".format(coeff)
+        elif isinstance(coeff, Fraction) and coeff.denominator > 1:
+            return str(coeff)
+        return str(int(coeff))
+
+    def power(self, var, expo):
+        if not var or not expo:
+            return ''
+        return var if expo == 1 else var + '^' + str(expo)
+
+    def term(self, var, expo, coeff, first):
+        """Text of one term, with the sign joining it to those before"""
+        negative = coeff < 0
+        text = self.number(-coeff if negative else coeff)
+        power = self.power(var, expo)
+        if power and text == '1':
+            text = ''
+        if first:
+            return ('-' if negative else '') + text + power
+        return (' - ' if negative else ' + ') + text + power
+
+
+class LatexStyle(PlainStyle):
+    r"""3x^{2} - \frac{1}{2}x + 1, for pasting into LaTeX math mode"""
+
+    def number(self, coeff):
+        if isinstance(coeff, Fraction) and coeff.denominator > 1:
+            return r'\frac{{{}}}{{{}}}'.format(coeff.numerator,
+                                               coeff.denominator)
+        text = PlainStyle.number(self, coeff)
+        if 'e' in text:
+            mantissa, scale = text.split('e')
+            return r'{} \times 10^{{{}}}'.format(mantissa, int(scale))
+        return text
+
+    def power(self, var, expo):
+        if not var or not expo:
+            return ''
+        return var if expo == 1 else '{}^{{{}}}'.format(var, expo)
+
+
+class MachineStyle():
+    """JSON list of [variable, exponent, coefficient] per term, with
+    coefficients at full precision. Fractions are written as strings
+    such as "1/3", since JSON has no exact rationals.
+    """
+
+    opening = '['
+    closing = ']'
+    empty = ''
+
+    def term(self, var, expo, coeff, first):
+        if isinstance(coeff, Fraction):
+            coeff = str(coeff)
+        text = json.dumps([var if expo else '', expo, coeff])
+        return text if first else ', ' + text
+
+
+PLAIN = PlainStyle()
+STYLES = {'plain': PLAIN, 'latex': LatexStyle(), 'machine': MachineStyle()}
+
+
+def get_style(style):
+    """Style for a name ('plain', 'latex', 'machine') or a style object"""
+    if not isinstance(style, str):
+        return style
+    try:
+        return STYLES[style.lower()]
+    except KeyError:
+        raise ValueError("Unknown output style ({})".format(style))
+
+
+def write(terms, out, style=PLAIN):
+    """Render (variable, exponent, coefficient) triples, highest exponent
+    first, passing the text to the function out a piece at a time. Zero
+    coefficients are skipped.
+    """
+    style = get_style(style)
+    term = style.term
+    out(style.opening)
+    first = True
+    for var, expo, coeff in terms:
+        if coeff:
+            out(term(var, expo, coeff, first))
+            first = False
+    if first:
+        out(style.empty)
+    out(style.closing)
+
+
+def text(terms, style=PLAIN):
+    """Rendered triples as one string"""
+    parts = []
+    write(terms, parts.append, style)
+    return ''.join(parts)
@@ -0,0 +1,210 @@
+"""
+Author: Ryan Roler (ryan.roler@gmail.com)
+Numerical root finding for dense coefficient sequences, lowest exponent
+first. Aberth-Ehrlich iteration refines every root at once, and through
+numpy many polynomials of one degree at once, each pass a handful of
+whole-array operations. The companion matrix's eigenvalues are the
+alternative. Either way the roots can be polished by Newton steps.
+"""
+
+import cmath
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+#: Aberth iteration stops once every correction is this small relative
+#: to its root, or after MAX_STEPS passes.
+TOLERANCE = 1e-14
+MAX_STEPS = 500
+#: Roots whose value is within this many times the rounding error of
+#: evaluating the polynomial there are as good as floats allow.
+ROUNDING = 4 * 2.0 ** -52
+#: Newton steps taken by polish.
+POLISH_STEPS = 2
+
+
+def _initial(coeffs, degree):
+    """Starting points spread around a circle whose radius is the
+    geometric mean of the roots' magnitudes, turned off the real axis so
+    that no two conjugate roots start out alike.
+    """
+    lead = abs(coeffs[..., -1])
+    const = abs(coeffs[..., 0])
+    radius = numpy.where(const > 0, (const / lead) ** (1.0 / degree), 1.0)
+    angles = 2 * numpy.pi * numpy.arange(degree) / degree + 0.4
+    return radius[..., None] * numpy.exp(1j * angles)
+
+
+def _ratio(coeffs, z):
+    """p(z) / p'(z) at every point of z, for every row of coefficients,
+    and whether p(z) is already within rounding error of zero: no larger
+    than the sum of |c_i| |z|^i times a few units in the last place.
+    Points outside the unit circle are evaluated through the reversed
+    polynomial at 1 / z so that no power of z overflows.
+    """
+    degree = coeffs.shape[-1] - 1
+    sizes = abs(coeffs)
+    rev_sizes = sizes[..., ::-1]
+    inside = abs(z) <= 1
+    with numpy.errstate(all='ignore'):
+        point = numpy.where(inside, z, 1 / z)
+        size = abs(point)
+        val = numpy.repeat(coeffs[..., -1:], z.shape[-1], axis=-1)
+        rev = numpy.repeat(coeffs[..., :1], z.shape[-1], axis=-1)
+        bound = numpy.where(inside, sizes[..., -1:], rev_sizes[..., -1:])
+        dval = numpy.zeros_like(val)
+        drev = numpy.zeros_like(rev)
+        for i in range(degree - 1, -1, -1):
+            dval = dval * point + val
+            val = val * point + coeffs[..., i:i + 1]
+            drev = drev * point + rev
+            rev = rev * point + coeffs[..., degree - i:degree - i + 1]
+            bound = bound * size + numpy.where(inside, sizes[..., i:i + 1],
+                                               rev_sizes[..., i:i + 1])
+        outer = z / (degree - point * drev / rev)
+        small = abs(numpy.where(inside, val, rev)) <= ROUNDING * bound
+        return numpy.where(inside, val / dval, outer), small
+
+
+def aberth(coeffs, tol=TOLERANCE, steps=MAX_STEPS):
+    """Roots of every row of a complex array of coefficients, which all
+    share one degree and have a non-zero leading coefficient. Each pass
+    moves every root z_k by w_k = r_k / (1 - r_k * sum(1 / (z_k - z_j)))
+    with r_k = p(z_k) / p'(z_k): Newton's step, deflated by all the other
+    roots. Roots that have converged, by a small enough step or a value
+    within rounding error of zero, are left in place.
+    """
+    coeffs = numpy.asarray(coeffs, dtype=complex)
+    coeffs = coeffs / abs(coeffs).max(axis=-1, keepdims=True)
+    degree = coeffs.shape[-1] - 1
+    z = _initial(coeffs, degree)
+    active = numpy.ones(z.shape, dtype=bool)
+    diag = numpy.arange(degree)
+    for _ in range(steps):
+        ratio, small = _ratio(coeffs, z)
+        active &= ~small
+        if not active.any():
+            break
+        with numpy.errstate(all='ignore'):
+            diffs = z[..., :, None] - z[..., None, :]
+            diffs[..., diag, diag] = numpy.inf
+            step = ratio / (1 - ratio * (1 / diffs).sum(axis=-1))
+        step = numpy.where(active & numpy.isfinite(step), step, 0)
+        z = z - step
+        active &= abs(step) > tol * numpy.maximum(abs(z), 1)
+    return z
+
+
+def companion(coeffs):
+    """Roots of every row as the eigenvalues of its companion matrix"""
+    coeffs = numpy.asarray(coeffs, dtype=complex)
+    degree = coeffs.shape[-1] - 1
+    matrix = numpy.zeros(coeffs.shape[:-1] + (degree, degree), dtype=complex)
+    matrix[..., 1:, :-1] = numpy.eye(degree - 1)
+    matrix[..., :, -1] = -coeffs[..., :-1] / coeffs[..., -1:]
+    return numpy.linalg.eigvals(matrix)
+
+
+def polish(coeffs, z, steps=POLISH_STEPS):
+    """Newton steps on every root at once"""
+    coeffs = numpy.asarray(coeffs, dtype=complex)
+    for _ in range(steps):
+        step = _ratio(coeffs, z)[0]
+        z = z - numpy.where(numpy.isfinite(step), step, 0)
+    return z
+
+
+def batch(coeffs, method='aberth', polished=True):
+    """Roots of many polynomials of one degree together: coeffs is a 2-D
+    array with one row of coefficients, lowest exponent first, per
+    polynomial. Returns a complex array with one row of roots apiece.
+    """
+    if numpy is None:
+        raise ValueError("Solving in batches needs numpy")
+    coeffs = numpy.asarray(coeffs, dtype=complex)
+    if coeffs.shape[-1] < 2:
+        return numpy.zeros(coeffs.shape[:-1] + (0,), dtype=complex)
+    if not coeffs[..., -1].all():
+        raise ValueError("Every leading coefficient must be non-zero")
+    if method == 'aberth':
+        z = aberth(coeffs)
+    elif method == 'companion':
+        z = companion(coeffs)
+    else:
+        raise ValueError("Unknown root finding method ({})".format(method))
+    return polish(coeffs, z) if polished else z
+
+
+def _py_ratio(coeffs, z):
+    """_ratio for a single point without numpy"""
+    degree = len(coeffs) - 1
+    if abs(z) <= 1:
+        point, order = z, coeffs[::-1]
+    else:
+        point, order = 1 / z, coeffs
+    size = abs(point)
+    val, dval, bound = order[0], 0, abs(order[0])
+    for coeff in order[1:]:
+        dval = dval * point + val
+        val = val * point + coeff
+        bound = bound * size + abs(coeff)
+    small = abs(val) <= ROUNDING * bound
+    if abs(z) <= 1:
+        return (val / dval if dval else 0), small
+    denom = degree - point * dval / val if val else 0
+    return (z / denom if denom else 0), small
+
+
+def _py_aberth(coeffs, tol=TOLERANCE, steps=MAX_STEPS):
+    """aberth for a single polynomial without numpy"""
+    degree = len(coeffs) - 1
+    const = abs(coeffs[0])
+    radius = (const / abs(coeffs[-1])) ** (1.0 / degree) if const else 1.0
+    z = [radius * cmath.exp(1j * (2 * cmath.pi * k / degree + 0.4))
+         for k in range(degree)]
+    active = [True] * degree
+    for _ in range(steps):
+        for k in range(degree):
+            if not active[k]:
+                continue
+            ratio, small = _py_ratio(coeffs, z[k])
+            if small:
+                active[k] = False
+                continue
+            near = sum(1 / (z[k] - z[j]) for j in range(degree)
+                       if j != k and z[k] != z[j])
+            denom = 1 - ratio * near
+            step = ratio / denom if denom else 0
+            z[k] -= step
+            active[k] = abs(step) > tol * max(abs(z[k]), 1)
+        if not any(active):
+            break
+    return z
+
+
+def find(coeffs, method='aberth', polished=True):
+    """Roots of one polynomial as a list of complex numbers. Roots at zero
+    are split off exactly beforehand.
+    """
+    coeffs = [complex(coeff) for coeff in coeffs]
+    while coeffs and not coeffs[-1]:
+        coeffs.pop()
+    zeros = 0
+    while zeros < len(coeffs) - 1 and not coeffs[zeros]:
+        zeros += 1
+    coeffs = coeffs[zeros:]
+    if len(coeffs) < 2:
+        found = []
+    elif numpy is not None:
+        found = batch([coeffs], method, polished)[0].tolist()
+    elif method != 'aberth':
+        raise ValueError("Method {} needs numpy".format(method))
+    else:
+        scale = max(map(abs, coeffs))
+        coeffs = [coeff / scale for coeff in coeffs]
+        found = _py_aberth(coeffs)
+        for _ in range(POLISH_STEPS if polished else 0):
+            found = [z - _py_ratio(coeffs, z)[0] for z in found]
+    return [0j] * zeros + found
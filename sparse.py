@@ -0,0 +1,291 @@
+"""
+Author: Ryan Roler (ryan.roler@gmail.com)
+Sparse exponent-indexed backend for high degree polynomials with few terms.
+"""
+
+from array import array
+from bisect import bisect_left
+from heapq import heapify, heappop, heappush
+
+import evaluate
+from domains import FLOAT
+
+#: In-place sums insert at most this many new exponents into the arrays,
+#: each insertion a single block move; more than that are merged.
+INSERT_LIMIT = 32
+
+
+def merge(a, b, sign=1, domain=FLOAT):
+    """Merge two sparse polynomials' (expos, coeffs) arrays, adding
+    sign * b to a. Cancelled coefficients are dropped.
+    """
+    a_expos, a_coeffs = a
+    b_expos, b_coeffs = b
+    expos, coeffs = array('q'), domain.storage()
+    i = j = 0
+    while i < len(a_expos) and j < len(b_expos):
+        if a_expos[i] < b_expos[j]:
+            expos.append(a_expos[i])
+            coeffs.append(a_coeffs[i])
+            i += 1
+        elif a_expos[i] > b_expos[j]:
+            expos.append(b_expos[j])
+            coeffs.append(sign * b_coeffs[j])
+            j += 1
+        else:
+            coeff = a_coeffs[i] + sign * b_coeffs[j]
+            if coeff:
+                expos.append(a_expos[i])
+                coeffs.append(coeff)
+            i += 1
+            j += 1
+    expos.extend(a_expos[i:])
+    coeffs.extend(a_coeffs[i:])
+    expos.extend(b_expos[j:])
+    coeffs.extend(sign * coeff for coeff in b_coeffs[j:])
+    return expos, coeffs
+
+
+def _nonzero(expos, coeffs, domain):
+    """Exponent and coefficient arrays with the zero coefficients left out"""
+    pairs = [(expo, coeff) for expo, coeff in zip(expos, coeffs) if coeff]
+    return (array('q', (expo for expo, coeff in pairs)),
+            domain.storage(coeff for expo, coeff in pairs))
+
+
+class Sparse():
+    """Sparse polynomials hold a single variable and two parallel arrays:
+    the exponents of the non-zero terms in ascending order, and their
+    coefficients. x^100000 + 3x^5 - 1 is kept as array('q', [0, 5, 100000])
+    and array('d', [-1.0, 3.0, 1.0]), so the leading term always sits in
+    the last slot. Coefficients are held in the domain's storage.
+    """
+
+    __slots__ = ('var', 'expos', 'coeffs', 'domain')
+
+    def __init__(self, expos=(), coeffs=(), var='', domain=FLOAT):
+        """Exponents must already be unique and ascending, with only
+        non-zero coefficients of the domain; use from_items for anything
+        else.
+        """
+        self.expos = expos if isinstance(expos, array) else array('q', expos)
+        if type(coeffs) is not type(domain.storage()):
+            coeffs = domain.storage(coeffs)
+        self.coeffs = coeffs
+        self.domain = domain
+        self.var = var if self.degree else ''
+
+    def __repr__(self):
+        return "Sparse({!r}, {!r}, {!r}, {!r})".format(
+            list(self.expos), list(self.coeffs), self.var, self.domain)
+
+    def __eq__(self, other):
+        if isinstance(other, Sparse):
+            return (self.var == other.var and self.expos == other.expos and
+                    self.coeffs == other.coeffs)
+        return NotImplemented
+
+    def __len__(self):
+        return len(self.expos)
+
+    def __copy__(self):
+        return Sparse(array('q', self.expos), self.coeffs[:], self.var,
+                      self.domain)
+
+    @classmethod
+    def from_items(cls, items, var='', domain=FLOAT):
+        """Build from (exponent, coefficient) pairs in any order, converting
+        the coefficients into the domain. Repeated exponents are summed.
+        """
+        merged = {}
+        convert = domain.convert
+        for expo, coeff in items:
+            merged[expo] = merged.get(expo, domain.zero) + convert(coeff)
+        expos = sorted(merged)
+        coeffs = domain.reduce(domain.storage(merged[expo] for expo in expos))
+        return cls(*_nonzero(expos, coeffs, domain), var=var, domain=domain)
+
+    def to_domain(self, domain):
+        """The same polynomial with its coefficients converted"""
+        if domain is self.domain:
+            return self
+        return Sparse.from_items(zip(self.expos, self.coeffs), self.var,
+                                 domain)
+
+    @property
+    def degree(self):
+        return self.expos[-1] if self.expos else 0
+
+    def nonzero(self):
+        return len(self.expos)
+
+    def leading(self):
+        """(exponent, coefficient) of the leading term"""
+        return self.expos[-1], self.coeffs[-1]
+
+    def coeff(self, expo):
+        """Coefficient of the given exponent, found by bisection"""
+        i = bisect_left(self.expos, expo)
+        if i < len(self.expos) and self.expos[i] == expo:
+            return self.coeffs[i]
+        return self.domain.zero
+
+    def item(self, index):
+        """index-th (exponent, coefficient) pair, highest exponent first"""
+        i = len(self.expos) - 1 - index if index >= 0 else -1 - index
+        if not 0 <= i < len(self.expos):
+            raise IndexError("Term index out of range")
+        return self.expos[i], self.coeffs[i]
+
+    def items(self):
+        """(exponent, coefficient) pairs, highest exponent first"""
+        return zip(reversed(self.expos), reversed(self.coeffs))
+
+    def compatible(self, other):
+        """Whether both polynomials can share a variable"""
+        return not (self.var and other.var and self.var != other.var)
+
+    def __join(self, other, expos, coeffs):
+        domain = self.domain
+        if domain.modulus:
+            expos, coeffs = _nonzero(expos, domain.reduce(coeffs), domain)
+        return Sparse(expos, coeffs, self.var or other.var, domain)
+
+    def __add__(self, other):
+        return self.__join(other, *merge((self.expos, self.coeffs),
+                                         (other.expos, other.coeffs),
+                                         1, self.domain))
+
+    def __sub__(self, other):
+        return self.__join(other, *merge((self.expos, self.coeffs),
+                                         (other.expos, other.coeffs),
+                                         -1, self.domain))
+
+    def __absorb(self, other, sign):
+        """Add sign * other into these arrays in place. Terms landing above
+        the leading term are appended, terms landing on exponents already
+        present are updated where they sit, in O(k log n) for k terms, and
+        up to INSERT_LIMIT new exponents are inserted; anything more takes
+        a full merge.
+        """
+        expos, coeffs, domain = self.expos, self.coeffs, self.domain
+        theirs = [coeff if sign > 0 else -coeff for coeff in other.coeffs]
+        if not expos or (other.expos and other.expos[0] > expos[-1]):
+            touched = range(len(expos), len(expos) + len(theirs))
+            expos.extend(other.expos)
+            coeffs.extend(theirs)
+        else:
+            places = [bisect_left(expos, expo) for expo in other.expos]
+            fresh = [j for j, (i, expo) in enumerate(zip(places, other.expos))
+                     if i == len(expos) or expos[i] != expo]
+            if len(fresh) > INSERT_LIMIT:
+                expos, coeffs = merge((expos, coeffs),
+                                      (other.expos, theirs), 1, domain)
+                touched = range(len(expos))
+            else:
+                for i, expo, coeff in zip(places, other.expos, theirs):
+                    if i < len(expos) and expos[i] == expo:
+                        coeffs[i] += coeff
+                # Highest first, so the places still to come stay put
+                for j in reversed(fresh):
+                    expos.insert(places[j], other.expos[j])
+                    coeffs.insert(places[j], theirs[j])
+                touched = [bisect_left(expos, expo) for expo in other.expos]
+        if domain.modulus:
+            for i in touched:
+                coeffs[i] %= domain.modulus
+        if not all(coeffs[i] for i in touched):
+            expos, coeffs = _nonzero(expos, coeffs, domain)
+        self.expos, self.coeffs = expos, coeffs
+        self.var = (self.var or other.var) if self.degree else ''
+        return self
+
+    def __iadd__(self, other):
+        return self.__absorb(other, 1)
+
+    def __isub__(self, other):
+        return self.__absorb(other, -1)
+
+    def __mul__(self, other):
+        prods = {}
+        for e1, c1 in zip(self.expos, self.coeffs):
+            for e2, c2 in zip(other.expos, other.coeffs):
+                prods[e1 + e2] = prods.get(e1 + e2, 0) + c1 * c2
+        res = Sparse.from_items(prods.items(), '', self.domain)
+        return self.__join(other, res.expos, res.coeffs)
+
+    def __divmod__(self, other):
+        """Long division that keeps the remainder in a dict with a heap of
+        its exponents, so each step finds the leading term in O(log n).
+        """
+        if not other.expos:
+            raise ZeroDivisionError("Division by the zero polynomial")
+        quo = self.domain.quo
+        top, lead = other.leading()
+        rest = list(zip(other.expos[:-1], other.coeffs[:-1]))
+        remain = dict(zip(self.expos, self.coeffs))
+        heap = [-expo for expo in self.expos]
+        heapify(heap)
+        quot = []
+        while heap and -heap[0] >= top:
+            expo = -heappop(heap)
+            coeff = remain.pop(expo)
+            if not coeff:
+                continue
+            factor = quo(coeff, lead)
+            if factor is None:
+                # Over a ring the division stops where the leading
+                # coefficient no longer divides.
+                remain[expo] = coeff
+                break
+            shift = expo - top
+            quot.append((shift, factor))
+            for sub_expo, sub_coeff in rest:
+                sub_expo += shift
+                if sub_expo in remain:
+                    remain[sub_expo] -= factor * sub_coeff
+                else:
+                    remain[sub_expo] = -factor * sub_coeff
+                    heappush(heap, -sub_expo)
+        quot.reverse()
+        remain = Sparse.from_items(remain.items(), '', self.domain)
+        return (self.__join(other, array('q', (e for e, c in quot)),
+                            (c for e, c in quot)),
+                self.__join(other, remain.expos, remain.coeffs))
+
+    def diff(self):
+        """Derivative"""
+        start = 1 if self.expos and not self.expos[0] else 0
+        return self.__join(self, array('q', (expo - 1 for expo in
+                                             self.expos[start:])),
+                           (coeff * expo for expo, coeff in
+                            zip(self.expos[start:], self.coeffs[start:])))
+
+    def integrate(self, constant):
+        """Antiderivative with the given constant term, both in a field"""
+        quo = self.domain.quo
+        expos = array('q', [0] if constant else [])
+        coeffs = self.domain.storage([constant] if constant else [])
+        expos.extend(expo + 1 for expo in self.expos)
+        coeffs.extend(quo(coeff, expo + 1)
+                      for expo, coeff in zip(self.expos, self.coeffs))
+        return self.__join(self, expos, coeffs)
+
+    def scale(self, factor):
+        """Multiply every coefficient by factor, already in the domain"""
+        if not factor:
+            return Sparse(domain=self.domain)
+        return self.__join(self, array('q', self.expos),
+                           (coeff * factor for coeff in self.coeffs))
+
+    def plug(self, value):
+        return evaluate.sparse_horner(self.expos, self.coeffs, value,
+                                      self.domain.modulus)
+
+    def plug_many(self, points):
+        return evaluate.sparse_horner_many(self.expos, self.coeffs, points,
+                                           self.domain.modulus)
+
+    def compile(self):
+        return evaluate.compile_sparse(self.expos, self.coeffs,
+                                       self.domain.modulus)
@@ -0,0 +1,127 @@
+"""
+Author: Ryan Roler (ryan.roler@gmail.com)
+Subproduct trees over dense coefficient sequences, lowest exponent first.
+The leaves are the linear factors x - p for every point p, and each node
+is the product of its two children. Remaindering a polynomial down the
+tree evaluates it at every point, and combining weights back up the tree
+interpolates, both in quasi-linear time on top of multiply.mul and the
+Newton division in division.py.
+"""
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+import division
+from dense import add, trim
+from domains import FLOAT
+from multiply import mul
+
+#: Below this many points evaluation skips the tree, as Horner's scheme
+#: is faster at that size.
+TREE_CUTOFF = 32
+
+
+def _mul(a, b, domain):
+    return domain.reduce(mul(a, b, domain.modulus))
+
+
+def _rem(a, b, domain):
+    if len(a) < len(b):
+        return a
+    return trim(domain.reduce(list(division.divmod_(a, b, domain)[1])))
+
+
+def build_tree(points, domain=FLOAT):
+    """Levels of the subproduct tree, leaves first and the product of
+    every x - p last. A node without a sibling is carried up unchanged.
+    """
+    level = [domain.reduce([-domain.convert(point), domain.one])
+             for point in points]
+    levels = [level]
+    while len(level) > 1:
+        level = ([_mul(level[i], level[i + 1], domain)
+                  for i in range(0, len(level) - 1, 2)] +
+                 ([level[-1]] if len(level) % 2 else []))
+        levels.append(level)
+    return levels
+
+
+def _descend(coeffs, levels, domain):
+    """Remainders of the coefficients by every leaf, from the root down"""
+    rems = [_rem(trim(list(coeffs)), levels[-1][0], domain)]
+    for level in reversed(levels[:-1]):
+        rems = [_rem(rems[i // 2], node, domain)
+                for i, node in enumerate(level)]
+    return [rem[0] if rem else domain.zero for rem in rems]
+
+
+def evaluate(coeffs, points, domain=FLOAT):
+    """Coefficients evaluated at every point. Each leaf x - p leaves the
+    constant remainder f(p), and every remainder on the way down is no
+    longer than the node it was taken by.
+    """
+    if not len(points):
+        return []
+    return _descend(coeffs, build_tree(points, domain), domain)
+
+
+def _derivative(coeffs, domain):
+    return domain.reduce([i * coeffs[i] for i in range(1, len(coeffs))])
+
+
+def _slopes(xs):
+    """m'(x_i) as the product of every x_i - x_j, for float points.
+    Remaindering in floating point cancels away too many digits to be
+    used for these.
+    """
+    if numpy is not None:
+        diffs = numpy.subtract.outer(numpy.asarray(xs, dtype=float),
+                                     numpy.asarray(xs, dtype=float))
+        numpy.fill_diagonal(diffs, 1.0)
+        return diffs.prod(axis=1).tolist()
+    slopes = []
+    for i, x in enumerate(xs):
+        slope = 1.0
+        for j, other in enumerate(xs):
+            if i != j:
+                slope *= x - other
+        slopes.append(slope)
+    return slopes
+
+
+def interpolate(xs, ys, domain=FLOAT):
+    """Coefficients of the polynomial of least degree through (x, y) for
+    every pair, in a field. With m the product of every x - x_i, the
+    Lagrange weights are y_i / m'(x_i), found by one remaindering pass
+    over exact domains, and the sum of w_i * m / (x - x_i) is built up
+    the tree: a node's sum is its left sum times its right child plus
+    its right sum times its left child.
+    """
+    if len(xs) != len(ys):
+        raise ValueError("Need as many x values as y values")
+    if not xs:
+        return []
+    if len(set(map(domain.convert, xs))) < len(xs):
+        raise ValueError("Interpolation points must be distinct")
+    levels = build_tree(xs, domain)
+    if domain.exact:
+        slopes = _descend(_derivative(levels[-1][0], domain), levels,
+                          domain)
+    else:
+        slopes = _slopes(xs)
+    sums = []
+    for y, slope in zip(ys, slopes):
+        if not slope:
+            raise ValueError("Products of the point differences "
+                             "underflow, use fewer points")
+        sums.append([domain.quo(domain.convert(y), slope)])
+    for below in levels[:-1]:
+        paired = [trim(domain.reduce(add(_mul(sums[i], below[i + 1], domain),
+                                         _mul(sums[i + 1], below[i], domain))))
+                  for i in range(0, len(below) - 1, 2)]
+        if len(below) % 2:
+            paired.append(sums[-1])
+        sums = paired
+    return sums[0]